@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark for t20.features.add_match_state_features on a corpus-sized
+synthetic frame (default 5,000 matches, ~1.2M deliveries).
+Usage:
+  python benchmarks/bench_features.py --matches 5000 [--repeat 3] [--min-rows-per-sec 1e6]
+Exits non-zero when the best run is below --min-rows-per-sec.
+"""
+import sys, time, argparse
+import numpy as np, pandas as pd
+
+from t20.features import add_match_state_features
+
+def synthetic_deliveries(n_matches, seed=0):
+    rng = np.random.default_rng(seed)
+    per_innings = 122  # 120 legal balls + a couple of wides
+    n = n_matches * 2 * per_innings
+    match = np.repeat(np.arange(n_matches), 2 * per_innings)
+    innings = np.tile(np.repeat([1, 2], per_innings), n_matches)
+    seq = np.tile(np.arange(per_innings), 2 * n_matches)
+    wide = rng.random(n) < 0.02
+    return pd.DataFrame({
+        "match_id": pd.Categorical(match.astype(str)),
+        "innings": innings.astype("int8"),
+        "over": (seq // 6).clip(0, 19).astype("int8"),
+        "ball_in_over": (seq % 6 + 1).astype("int8"),
+        "runs_batter": rng.choice([0, 0, 0, 1, 1, 2, 4, 6], n).astype("int8"),
+        "runs_extras": wide.astype("int8"),
+        "runs_total": rng.choice([0, 0, 1, 1, 2, 4, 6], n).astype("int8"),
+        "extras_type": pd.Categorical(np.where(wide, "wides", None)),
+        "wicket_event": rng.random(n) < 0.04,
+    })
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matches", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--min-rows-per-sec", type=float, default=0.0)
+    args = ap.parse_args()
+
+    df = synthetic_deliveries(args.matches)
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        add_match_state_features(df)
+        best = min(best, time.perf_counter() - t0)
+    rate = len(df) / best
+    print(f"add_match_state_features: {len(df):,} rows, {args.matches:,} matches, "
+          f"best {best:.3f}s -> {rate:,.0f} rows/sec")
+    if rate < args.min_rows_per_sec:
+        print(f"[FAIL] below {args.min_rows_per_sec:,.0f} rows/sec")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
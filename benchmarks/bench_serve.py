@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Load test for the local WP service (t20.serve): concurrent keep-alive clients send
+single-state or batch requests and the client-side latency percentiles are reported.
+Usage:
+  python benchmarks/bench_serve.py --clients 16 --requests 500              # spawns t20-serve
+  python benchmarks/bench_serve.py --url http://127.0.0.1:8765 --batch 64   # a running instance
+  python benchmarks/bench_serve.py --unix /tmp/t20-wp.sock --distinct 200
+Without --url/--unix a `t20-serve` is started on a free port (extra flags via --serve-args)
+and stopped afterwards. States are drawn from --distinct random chase states (seeded), so
+--distinct sets how often the server's LRU cache hits. Prints throughput, p50/p90/p99/max
+latency, errors and the server's own /stats; --json writes the same as a JSON file.
+"""
+import os, sys, json, time, shlex, random, socket, argparse, threading, subprocess
+import http.client
+from urllib.parse import urlparse
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+def connector(url=None, unix=None):
+    if unix:
+        return lambda: UnixHTTPConnection(unix)
+    u = urlparse(url)
+    return lambda: http.client.HTTPConnection(u.hostname, u.port, timeout=30)
+
+def request(conn, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"} if data else {})
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read() or b"null")
+
+def random_states(n, seed):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        target = rng.randint(100, 220)
+        balls = rng.randint(1, 120)
+        out.append({"target": target, "runs_remaining": rng.randint(1, target), "balls_remaining": balls,
+                    "wickets": rng.randint(0, 9)})
+    return out
+
+def client(connect, states, n_requests, batch, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = connect()
+    for _ in range(n_requests):
+        if batch > 1:
+            path, body = "/wp/batch", {"states": [rng.choice(states) for _ in range(batch)]}
+        else:
+            path, body = "/wp", rng.choice(states)
+        t0 = time.perf_counter()
+        try:
+            status, _ = request(conn, "POST", path, body)
+        except (OSError, http.client.HTTPException):
+            conn.close(); conn = connect()
+            status = None
+        latencies.append(time.perf_counter() - t0)
+        if status != 200:
+            errors.append(status)
+    conn.close()
+
+def spawn(serve_args):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cmd = [sys.executable, "-m", "t20.serve", "--port", str(port)] + shlex.split(serve_args)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()  # "[OK] Serving WP on ..." once the model is loaded
+    if not line.startswith("[OK]"):
+        proc.kill()
+        raise SystemExit(f"[ERR] t20-serve did not start: {line.strip()}")
+    return proc, f"http://127.0.0.1:{port}"
+
+def percentile(sorted_values, q):
+    return 1000 * sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+def main():
+    ap = argparse.ArgumentParser()
+    target = ap.add_mutually_exclusive_group()
+    target.add_argument("--url", type=str, default=None, help="Running service (default: spawn one)")
+    target.add_argument("--unix", type=str, default=None, help="Running service on a Unix socket")
+    ap.add_argument("--serve-args", type=str, default="", help="Extra t20-serve flags when spawning")
+    ap.add_argument("--clients", type=int, default=8, help="Concurrent connections")
+    ap.add_argument("--requests", type=int, default=500, help="Requests per client")
+    ap.add_argument("--batch", type=int, default=1, help="States per request (>1 uses /wp/batch)")
+    ap.add_argument("--distinct", type=int, default=5000, help="Distinct states requests are drawn from")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", type=str, default=None, help="Also write the results here")
+    args = ap.parse_args()
+
+    proc = None
+    if not (args.url or args.unix):
+        proc, args.url = spawn(args.serve_args)
+    try:
+        connect = connector(args.url, args.unix)
+        states = random_states(args.distinct, args.seed)
+        latencies, errors = [], []
+        threads = [threading.Thread(target=client, args=(connect, states, args.requests, args.batch,
+                                                         args.seed + 1 + i, latencies, errors))
+                   for i in range(args.clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        conn = connect()
+        _, server = request(conn, "GET", "/stats")
+        conn.close()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    lat = sorted(latencies)
+    n = len(lat)
+    doc = {
+        "config": {"clients": args.clients, "requests": args.requests, "batch": args.batch,
+                   "distinct": args.distinct, "seed": args.seed, "serve_args": args.serve_args,
+                   "target": args.unix or ("spawned" if proc else args.url)},
+        "requests": n, "states": n * args.batch, "errors": len(errors), "seconds": elapsed,
+        "requests_per_s": n / elapsed, "states_per_s": n * args.batch / elapsed,
+        "latency_ms": {"p50": percentile(lat, 0.50), "p90": percentile(lat, 0.90), "p99": percentile(lat, 0.99),
+                       "max": 1000 * lat[-1]},
+        "server": server,
+    }
+    l = doc["latency_ms"]
+    print(f"{n:,} requests ({doc['states']:,} states) from {args.clients} clients in {elapsed:.2f}s: "
+          f"{doc['requests_per_s']:,.0f} req/s, {doc['states_per_s']:,.0f} states/s, errors {len(errors)}")
+    print(f"latency ms  p50 {l['p50']:.2f}  p90 {l['p90']:.2f}  p99 {l['p99']:.2f}  max {l['max']:.2f}")
+    hit = server.get("cache_hit_rate")
+    print(f"server      p50 {server['latency_p50_ms']:.2f}  p99 {server['latency_p99_ms']:.2f} ms in handler,"
+          f" cache hit rate {'-' if hit is None else f'{hit:.1%}'}, {server['cache_size']:,} states cached")
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+        print("[OK] Wrote:", args.json)
+    if errors:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Stage benchmarks on a synthetic Cricsheet corpus (t20.synth): throughput, per-unit latency
+and peak traced memory for extract, features, WP scoring and figures.
+Usage:
+  python benchmarks/bench_stages.py --matches 1000 [--workers 1] [--stages extract features wp figures]
+  python benchmarks/bench_stages.py --matches 100000 --stages extract features --no-memory
+Stages:
+  extract   parse + flatten every match of the zip (t20.extract.iter_parsed, mode "rows")
+  features  add_match_state_features over the whole corpus frame
+  wp        t20.wp_pipeline.enrich (WP, metrics, chase simulator) over every chase
+  figures   the per-file WP figures and Figure X/Y for --figure-matches matches
+Throughput is the best of --repeat runs over the whole stage; latency is per unit (one
+match, or one figure) over --latency-sample units; peak memory is the tracemalloc peak of
+one extra run (parent process only). The corpus is generated once per (matches, seed,
+legacy share) under --workdir.
+Each run is appended to <out>/history.jsonl with the git commit, and compared with the
+last run of the same configuration; --fail-on-regression exits non-zero when a stage's
+throughput drops or its peak memory grows by more than --tolerance.
+"""
+import os, sys, json, time, argparse, platform, subprocess, tempfile, tracemalloc
+import numpy as np, pandas as pd
+
+from t20.synth import write_corpus
+
+STAGES = ("extract", "features", "wp", "figures")
+
+def git_commit():
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo,
+                                    capture_output=True, text=True).stdout.strip())
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def latency_ms(fn, units):
+    times = []
+    for u in units:
+        t0 = time.perf_counter()
+        fn(u)
+        times.append(1000 * (time.perf_counter() - t0))
+    if not times:
+        return None
+    return {"n": len(times), "p50": float(np.percentile(times, 50)), "p95": float(np.percentile(times, 95)),
+            "max": float(max(times))}
+
+def measure(fn, repeat, memory):
+    """(result of the last run, best seconds, peak traced MB or None)."""
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return out, best, peak
+
+# ---- stages: each returns (output, units, rows) ----
+
+def stage_extract(zip_path, names, workers):
+    from t20.extract import iter_parsed
+    frames = []
+    for name, info, rows in iter_parsed(names, zip_path, workers, batch_size=64, mode="rows"):
+        if rows:
+            frames.append(pd.DataFrame(rows).assign(match_id=os.path.splitext(name)[0]))
+    df = pd.concat(frames, ignore_index=True)
+    return df, len(frames), len(df)
+
+def stage_features(bbb):
+    from t20.features import add_match_state_features
+    feat = add_match_state_features(bbb)
+    return feat, feat["match_id"].nunique(), len(feat)
+
+def stage_wp(feat, sim_paths):
+    from t20.simulate import ChaseSimulator, fit_outcomes
+    from t20.wp_pipeline import enrich
+    # a cold simulator per run: the memo is part of what is measured
+    df_opt, metrics = enrich(feat, sim=ChaseSimulator(fit_outcomes(feat), n_paths=sim_paths))
+    return df_opt, df_opt["match_id"].nunique(), len(df_opt)
+
+def figure_jobs(df_opt, outdir, n_matches):
+    from t20.figures import wp_figure_data, wp_figure_jobs, chases, figure_xy_jobs
+    from t20.wp_pipeline import calibration_curve_df
+    jobs = []
+    for i, (_, ch) in enumerate(chases(df_opt)):
+        if i >= n_matches:
+            break
+        base = f"bench_{i}"
+        jobs += wp_figure_jobs(base, outdir, wp_figure_data(ch, calibration_curve_df(ch)))
+        jobs += figure_xy_jobs(ch, outdir, tag=base)
+    return jobs
+
+def stage_figures(jobs, workers):
+    from t20.figures import render_jobs
+    paths = render_jobs(jobs, workers)
+    return paths, len(paths), len(paths)
+
+def compare(prev, cur, tolerance):
+    """Lines describing the change per stage, and the stages that regressed."""
+    lines, regressed = [], []
+    for stage, now in cur["stages"].items():
+        old = (prev or {}).get("stages", {}).get(stage)
+        if not old:
+            continue
+        d_rate = now["throughput"] / old["throughput"] - 1 if old["throughput"] else 0.0
+        d_mem = (now["peak_mb"] / old["peak_mb"] - 1) if now.get("peak_mb") and old.get("peak_mb") else 0.0
+        bad = d_rate < -tolerance or d_mem > tolerance
+        lines.append(f"  {stage:<9s} throughput {d_rate:+7.1%}   peak memory {d_mem:+7.1%}"
+                     f"   vs {prev.get('commit') or '?'}{'   <-- regression' if bad else ''}")
+        if bad:
+            regressed.append(stage)
+    return lines, regressed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matches", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--legacy-share", type=float, default=0.2)
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    ap.add_argument("--workers", type=int, default=1, help="Processes for extract and figures")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--latency-sample", type=int, default=20, help="Units timed one at a time per stage")
+    ap.add_argument("--sim-paths", type=int, default=500)
+    ap.add_argument("--figure-matches", type=int, default=5)
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    ap.add_argument("--workdir", type=str, default=os.path.join(tempfile.gettempdir(), "t20_bench"))
+    ap.add_argument("--out", type=str, default=os.path.join(os.path.dirname(__file__), "results"))
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    zip_path = os.path.join(args.workdir, f"synth_{args.matches}_{args.seed}_{args.legacy_share:g}.zip")
+    if not os.path.exists(zip_path):
+        t0 = time.perf_counter()
+        stats = write_corpus(zip_path, args.matches, args.seed, args.legacy_share)
+        print(f"[OK] Generated {stats['matches']:,} matches ({stats['deliveries']:,} deliveries) "
+              f"in {time.perf_counter() - t0:.1f}s -> {zip_path}")
+    from t20.extract import list_zip_members, parse_batch, _init_reader
+    names = list_zip_members(zip_path)
+    memory = not args.no_memory
+    sample = names[:args.latency_sample]
+    results = {}
+
+    def record(stage, units, unit, rows, secs, peak, lat):
+        results[stage] = {"units": units, "unit": unit, "rows": rows, "seconds": secs,
+                          "throughput": units / secs, "rows_per_sec": rows / secs, "latency_ms": lat, "peak_mb": peak}
+        print(f"{stage:<9s} {units:>9,} {unit:<8s} {rows:>11,} rows  {secs:8.3f}s  {units / secs:>11,.1f} {unit}/s"
+              f"  p50 {lat['p50'] if lat else float('nan'):8.2f} ms  peak {peak if peak is not None else float('nan'):8.1f} MB")
+
+    # every stage runs on the previous stage's output; stages not asked for run once, unmeasured
+    stages = set(args.stages)
+    last = max(STAGES.index(s) for s in stages)
+    run = lambda stage, fn: measure(fn, args.repeat if stage in stages else 1, memory and stage in stages)
+
+    (bbb, units, rows), secs, peak = run("extract", lambda: stage_extract(zip_path, names, args.workers))
+    if "extract" in stages:
+        _init_reader(zip_path)
+        record("extract", units, "matches", rows, secs, peak, latency_ms(lambda n: parse_batch([n], "rows"), sample))
+    sample_ids = [os.path.splitext(n)[0] for n in sample]
+    if last >= 1:
+        by_match = dict(tuple(bbb.groupby("match_id", sort=False)))
+        sample_ids = [m for m in sample_ids if m in by_match]
+        (feat, units, rows), secs, peak = run("features", lambda: stage_features(bbb))
+        if "features" in stages:
+            from t20.features import add_match_state_features
+            record("features", units, "matches", rows, secs, peak,
+                   latency_ms(lambda m: add_match_state_features(by_match[m]), sample_ids))
+    if last >= 2:
+        (df_opt, units, rows), secs, peak = run("wp", lambda: stage_wp(feat, args.sim_paths))
+        if "wp" in stages:
+            from t20.simulate import ChaseSimulator, fit_outcomes
+            from t20.wp_pipeline import enrich
+            counts = fit_outcomes(feat)
+            feat_by_match = dict(tuple(feat.groupby("match_id", sort=False)))
+            record("wp", units, "matches", rows, secs, peak,
+                   latency_ms(lambda m: enrich(feat_by_match[m], sim=ChaseSimulator(counts, n_paths=args.sim_paths)),
+                              sample_ids))
+    if last >= 3:
+        from t20.figures import render
+        with tempfile.TemporaryDirectory() as outdir:
+            jobs = figure_jobs(df_opt, outdir, args.figure_matches)
+            (_, units, rows), secs, peak = run("figures", lambda: stage_figures(jobs, args.workers))
+            record("figures", units, "figures", rows, secs, peak, latency_ms(render, jobs[:args.latency_sample]))
+
+    import matplotlib
+    commit, dirty = git_commit()
+    doc = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit, "dirty": dirty,
+        "config": {"matches": args.matches, "seed": args.seed, "legacy_share": args.legacy_share,
+                   "workers": args.workers, "sim_paths": args.sim_paths, "figure_matches": args.figure_matches,
+                   "repeat": args.repeat, "memory": memory},
+        "env": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                "matplotlib": matplotlib.__version__, "machine": platform.machine(), "cpus": os.cpu_count()},
+        "stages": results,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    history = os.path.join(args.out, "history.jsonl")
+    prev = None
+    if os.path.exists(history):
+        with open(history, encoding="utf-8") as f:
+            same = [d for d in map(json.loads, filter(None, map(str.strip, f))) if d.get("config") == doc["config"]]
+        prev = same[-1] if same else None
+    with open(history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(doc) + "\n")
+    print(f"[OK] Appended to {history} (commit {commit or '?'}{', dirty' if dirty else ''})")
+
+    lines, regressed = compare(prev, doc, args.tolerance)
+    if lines:
+        print("\n".join(lines))
+    if regressed and args.fail_on_regression:
+        print(f"[FAIL] Regressed by more than {args.tolerance:.0%}:", ", ".join(regressed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
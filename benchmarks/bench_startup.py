@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Startup budget for the t20-* commands: wall time of `<command> --help` (median of
+--repeat runs, each a fresh interpreter) next to a bare `python -c pass`, plus the heavy
+libraries each command pulled in just to print its help.
+Usage:
+  python benchmarks/bench_startup.py [--repeat 10] [--budget-ms 100]
+Exits non-zero when a command's median exceeds --budget-ms, or when a command that
+only needs the standard library for --help imports numpy/pandas/matplotlib.
+"""
+import sys, time, argparse, statistics, subprocess
+
+COMMANDS = {
+    "t20-extract": "t20.extract",
+    "t20-features": "t20.build_features",
+    "t20-wp": "t20.wp_pipeline",
+    "t20-fig-indpak": "t20.figures",
+    "t20-index": "t20.index",
+    "t20-train-wp": "t20.wp_table",
+    "t20-live": "t20.live",
+    "t20-run": "t20.pipeline",
+    "t20-fit-sim": "t20.simulate",
+    "t20-synth": "t20.synth",
+    "t20-cube": "t20.cube",
+    "t20-serve": "t20.serve",
+    "t20-timelines": "t20.timelines",
+}
+HEAVY = ("numpy", "pandas", "matplotlib", "sklearn", "pyarrow")
+
+# what the console-script wrapper does, plus a report of the heavy modules loaded
+PROBE = """
+import sys, atexit
+atexit.register(lambda: sys.stderr.write("HEAVY:" + ",".join(m for m in {heavy!r} if m in sys.modules) + "\\n"))
+from {module} import main
+sys.argv = [{name!r}, "--help"]
+main()
+"""
+
+def time_run(cmd, repeat):
+    times, stderr = [], ""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        times.append(1000 * (time.perf_counter() - t0))
+        stderr = proc.stderr
+    return statistics.median(times), stderr
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--budget-ms", type=float, default=100.0)
+    args = ap.parse_args()
+
+    bare, _ = time_run([sys.executable, "-c", "pass"], args.repeat)
+    print(f"{'python -c pass':<16s} {bare:7.1f} ms")
+    failed = []
+    for name, module in COMMANDS.items():
+        code = PROBE.format(heavy=HEAVY, module=module, name=name)
+        ms, stderr = time_run([sys.executable, "-c", code], args.repeat)
+        heavy = next((l[6:] for l in stderr.splitlines() if l.startswith("HEAVY:")), "?")
+        print(f"{name:<16s} {ms:7.1f} ms  (+{ms - bare:5.1f} over bare)  heavy: {heavy or '-'}")
+        if ms > args.budget_ms or heavy:
+            failed.append(name)
+    if failed:
+        print("[FAIL] Over budget or heavy imports on --help:", ", ".join(failed))
+        sys.exit(1)
+    print(f"[OK] All commands under {args.budget_ms:g} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+HTTP side of the WP service (t20.serve): request handlers and the threaded TCP / Unix-socket
+servers. Kept out of t20.serve so `t20-serve --help` does not import http.server.
+"""
+import os, json, time, socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from t20.serve import Counters, discretize
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients reuse their connection
+    server_version = "t20-serve"
+    # headers and body are separate writes: without TCP_NODELAY each response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def _send(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}")
+
+    def do_GET(self):
+        t0 = time.perf_counter()
+        if self.path == "/health":
+            self._send(200, {"ok": True, "model": getattr(self.server.scorer.model, "name", "placeholder"),
+                             "sim": self.server.scorer.sim is not None})
+        elif self.path == "/stats":
+            self._send(200, self.server.counters.snapshot(self.server.scorer))
+            return
+        else:
+            self._send(404, {"error": f"no such endpoint: {self.path}"})
+        self.server.counters.record(self.path, 0, time.perf_counter() - t0)
+
+    def do_POST(self):
+        t0 = time.perf_counter()
+        scorer, n = self.server.scorer, 0
+        try:
+            body = self._body()
+            if self.path == "/wp":
+                n = 1
+                self._send(200, scorer.score([discretize(body)])[0])
+            elif self.path == "/wp/batch":
+                keys = [discretize(s) for s in body.get("states", [])]
+                n = len(keys)
+                self._send(200, {"results": scorer.score(keys)})
+            else:
+                self._send(404, {"error": f"no such endpoint: {self.path}"})
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send(400, {"error": str(e)})
+            self.server.counters.record(self.path, 0, time.perf_counter() - t0, ok=False)
+            return
+        self.server.counters.record(self.path, n, time.perf_counter() - t0)
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+class UnixHandler(Handler):
+    disable_nagle_algorithm = False  # not a TCP socket
+
+# socketserver listens with a backlog of 5: more concurrent clients see 1 s SYN retries
+class TCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+def make_server(scorer, host="127.0.0.1", port=8765, unix=None, verbose=False):
+    if unix:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        server = UnixHTTPServer(unix, UnixHandler)
+    else:
+        server = TCPHTTPServer((host, port), Handler)
+    server.scorer, server.counters, server.verbose = scorer, Counters(), verbose
+    return server
@@ -0,0 +1,132 @@
+"""
+Feature stage (`t20-features`, scripts/02_build_features.py).
+
+Build match-state features for the extracted ball-by-ball CSVs.
+Usage:
+  t20-features --indir outputs --outdir outputs
+  t20-features --dataset data/processed/t20i [--seasons 2022 2023]
+With --dataset, reads only the needed delivery columns/season partitions of the
+columnar dataset and writes <dataset>/features partitioned by season.
+With --chunksize N, CSVs are streamed N rows at a time with compact dtypes (input must
+be in delivery order, as written by 01), so memory stays flat for corpus-sized files.
+Timings, rows and bytes per sub-step go to the run report (t20.instrument).
+pandas and t20.features are imported only once there is work to do.
+"""
+import os, shutil, argparse
+
+from t20.instrument import step, file_size, add_arguments, stage_run
+
+FEATURE_INPUT_COLUMNS = [
+    "match_id", "innings", "batting_team", "over", "ball_in_over", "striker", "non_striker",
+    "bowler", "runs_batter", "runs_extras", "runs_total", "extras_type", "wicket_event",
+]
+
+def build_dataset_features(root, seasons=None, cache=None):
+    from t20.dataset import read_deliveries, list_seasons, write_partitioned
+    from t20.features import add_match_state_features
+    out_path = os.path.join(root, "features")
+    for season in seasons or list_seasons(root):
+        in_part = os.path.join(root, "deliveries", f"season={season}")
+        out_part = os.path.join(out_path, f"season={season}")
+        unit = cache and cache.rel(out_part)
+        if cache and cache.fresh(unit, [in_part], [out_part]):
+            print("[SKIP] Up to date:", out_part)
+            continue
+        with step("dataset_read") as s:
+            df = read_deliveries(root, columns=FEATURE_INPUT_COLUMNS, seasons=[season])
+            s.rows += len(df); s.bytes_read += file_size(in_part)
+        if df.empty:
+            continue
+        with step("feature_compute") as s:
+            feat_df = add_match_state_features(df)
+            s.rows += len(feat_df)
+        feat_df["season"] = season
+        shutil.rmtree(out_part, ignore_errors=True)
+        with step("dataset_write") as s:
+            write_partitioned(feat_df, out_path)
+            s.rows += len(feat_df); s.bytes_written += file_size(out_part)
+        if cache:
+            cache.record(unit, [in_part], [out_part])
+        print("[OK] Wrote:", out_part, "(rows:", len(feat_df), ")")
+
+def build_csv_features_streaming(in_path, out_path, chunksize):
+    from t20.features import read_csv_chunks, StreamingFeatures
+    engine = StreamingFeatures()
+    n_rows = 0
+    tmp = out_path + ".part"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        chunks = read_csv_chunks(in_path, chunksize)
+        while True:
+            with step("csv_read") as read:
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            read.rows += len(chunk)
+            with step("feature_compute") as s:
+                feat = engine.process(chunk)
+                s.rows += len(feat)
+            with step("csv_write") as write:
+                feat.to_csv(f, index=False, header=n_rows == 0)
+                write.rows += len(feat)
+            n_rows += len(feat)
+    os.replace(tmp, out_path)
+    read.bytes_read += file_size(in_path)
+    if n_rows:
+        write.bytes_written += file_size(out_path)
+    return n_rows
+
+def build_csv_features(in_path, out_path):
+    import pandas as pd
+    from t20.features import add_match_state_features
+    with step("csv_read") as s:
+        df = pd.read_csv(in_path)
+        s.rows += len(df); s.bytes_read += file_size(in_path)
+    with step("feature_compute") as s:
+        feat_df = add_match_state_features(df)
+        s.rows += len(feat_df)
+    with step("csv_write") as s:
+        feat_df.to_csv(out_path, index=False, encoding="utf-8")
+        s.rows += len(feat_df); s.bytes_written += file_size(out_path)
+    return len(feat_df)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build match-state features for ball-by-ball CSVs or the columnar dataset")
+    ap.add_argument("--indir", type=str, default="outputs", help="Folder with ball-by-ball CSVs")
+    ap.add_argument("--outdir", type=str, default="outputs", help="Where to write *_features.csv")
+    ap.add_argument("--dataset", type=str, default=None, help="Columnar dataset root written by 01 --all")
+    ap.add_argument("--seasons", nargs="*", default=None, help="Season partitions to build (default: all)")
+    ap.add_argument("--manifest", type=str, default="manifest.json", help="Manifest holding the stage cache")
+    ap.add_argument("--force", action="store_true", help="Ignore the cache and rebuild everything")
+    ap.add_argument("--chunksize", type=int, default=None, help="Stream CSVs this many rows at a time")
+    add_arguments(ap)
+    args = ap.parse_args(argv)
+    with stage_run("features", args, argv):
+        _run(args)
+
+def _run(args):
+    from t20.cache import StageCache, module_files
+    cache = StageCache("features", module_files("build_features", "dataset", "features"), manifest=args.manifest, force=args.force)
+    if args.dataset:
+        build_dataset_features(args.dataset, args.seasons, cache)
+        cache.save()
+        return
+
+    files = [f for f in os.listdir(args.indir) if f.endswith("_ball_by_ball.csv")]
+    os.makedirs(args.outdir, exist_ok=True)
+    for fname in files:
+        in_path = os.path.join(args.indir, fname)
+        name, _ = os.path.splitext(fname)
+        out_path = os.path.join(args.outdir, f"{name}_features.csv")
+        if cache.fresh(cache.rel(out_path), [in_path], [out_path]):
+            print("[SKIP] Up to date:", out_path)
+            continue
+        if args.chunksize:
+            n_rows = build_csv_features_streaming(in_path, out_path, args.chunksize)
+        else:
+            n_rows = build_csv_features(in_path, out_path)
+        cache.record(cache.rel(out_path), [in_path], [out_path])
+        print("[OK] Wrote:", out_path, "(rows:", n_rows, ")")
+    cache.save()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Content-hashed stage cache kept in manifest.json.
+
+Each stage records, per unit of work (a file, a season partition, ...), the sha256 of
+its inputs, a digest of the code that produced it, its parameters and a stamp of
+every output. A unit is skipped when all of those still match and the outputs are
+untouched. File hashes are memoised by size/mtime so unchanged inputs are not re-read.
+
+manifest.json gains two sections next to "scripts"/"artifacts":
+  "cache":  {stage: {unit: {"inputs", "code", "params", "outputs", ...}}}
+  "hashes": {path: {"stamp", "sha256"}}
+"""
+import os, json, hashlib
+
+DEFAULT_MANIFEST = "manifest.json"
+CHUNK = 1 << 20
+
+def _stamp(path):
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def _walk(path):
+    for dirpath, _, files in os.walk(path):
+        for f in sorted(files):
+            yield os.path.join(dirpath, f)
+
+def module_files(*names):
+    """Paths of t20 modules (without importing them) for a stage's code digest."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    return [os.path.join(here, f"{n}.py") for n in names]
+
+def code_digest(paths):
+    h = hashlib.sha256()
+    for p in sorted(paths):
+        with open(p, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def _jsonable(obj):
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if isinstance(obj, dict):
+        return {str(k): _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    return obj
+
+class StageCache:
+    def __init__(self, stage, code_files=(), params=None, manifest=DEFAULT_MANIFEST, force=False):
+        self.stage = stage
+        self.manifest_path = manifest
+        self.root = os.path.dirname(os.path.abspath(manifest))
+        self.force = force
+        self.code = code_digest(code_files)
+        self.params = _jsonable(params or {})
+        self.manifest = {}
+        if os.path.exists(manifest):
+            with open(manifest, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        self.hashes = self.manifest.setdefault("hashes", {})
+        self.entries = self.manifest.setdefault("cache", {}).setdefault(stage, {})
+
+    def rel(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def file_digest(self, path):
+        key, stamp = self.rel(path), _stamp(path)
+        memo = self.hashes.get(key)
+        if memo and memo["stamp"] == stamp:
+            return memo["sha256"]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK), b""):
+                h.update(block)
+        self.hashes[key] = {"stamp": stamp, "sha256": h.hexdigest()}
+        return self.hashes[key]["sha256"]
+
+    def digest(self, path):
+        if not os.path.isdir(path):
+            return self.file_digest(path)
+        h = hashlib.sha256()
+        for p in _walk(path):
+            h.update(os.path.relpath(p, path).encode()); h.update(self.file_digest(p).encode())
+        return h.hexdigest()
+
+    def output_stamp(self, path):
+        if not os.path.isdir(path):
+            return _stamp(path)
+        listing = "|".join(f"{os.path.relpath(p, path)}:{_stamp(p)}" for p in _walk(path))
+        return hashlib.sha256(listing.encode()).hexdigest()
+
+    def _key(self, inputs):
+        return {
+            "inputs": {self.rel(p): self.digest(p) for p in inputs},
+            "code": self.code,
+            "params": self.params,
+        }
+
+    def get(self, unit):
+        return self.entries.get(unit)
+
+    def fresh(self, unit, inputs, outputs=None):
+        """True when `unit` can be skipped: same inputs/code/params and untouched outputs.
+
+        `outputs` defaults to the outputs recorded for the unit."""
+        entry = self.entries.get(unit)
+        if self.force or entry is None:
+            return False
+        recorded = entry.get("outputs") or {}
+        if outputs is None:
+            outputs = [os.path.join(self.root, rel) for rel in recorded]
+        if not outputs or any(not os.path.exists(o) for o in outputs):
+            return False
+        if {k: entry.get(k) for k in ("inputs", "code", "params")} != self._key(inputs):
+            return False
+        return recorded == {self.rel(o): self.output_stamp(o) for o in outputs}
+
+    def record(self, unit, inputs, outputs, **extra):
+        entry = self._key(inputs)
+        entry["outputs"] = {self.rel(o): self.output_stamp(o) for o in outputs if os.path.exists(o)}
+        entry.update(_jsonable(extra))
+        self.entries[unit] = entry
+
+    def save(self):
+        # re-read so concurrent stages writing other sections are kept
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        manifest.setdefault("hashes", {}).update(self.hashes)
+        manifest.setdefault("cache", {})[self.stage] = self.entries
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
@@ -0,0 +1,155 @@
+"""
+Cricsheet JSON helpers shared by the extractor and the match index:
+decoding (orjson when installed), team/event normalisation and flattening of
+v2 (`overs`/`deliveries`) and legacy (`1st innings`) innings into ball-by-ball rows.
+"""
+import json, re
+
+try:
+    import orjson
+    def load_json(raw):
+        return orjson.loads(raw)
+except ImportError:
+    def load_json(raw):
+        return json.loads(raw)
+
+_INFO_KEY = re.compile(r'"info"\s*:\s*')
+_DECODER = json.JSONDecoder()
+
+def read_info(raw):
+    """Decode only the `info` block of a match file, falling back to a full parse."""
+    text = raw.decode("utf-8") if isinstance(raw, (bytes, bytearray)) else raw
+    m = _INFO_KEY.search(text)
+    if m:
+        try:
+            info, _ = _DECODER.raw_decode(text, m.end())
+            if isinstance(info, dict) and ("dates" in info or "teams" in info):
+                return info
+        except ValueError:
+            pass
+    return load_json(raw).get("info", {})
+
+TEAM_SYNONYMS = {
+    "west indies men": "west indies",
+    "windies": "west indies",
+    "england men": "england",
+    "india men": "india",
+    "pakistan men": "pakistan",
+}
+
+def norm_team_name(t):
+    t = (t or "").strip().lower()
+    return TEAM_SYNONYMS.get(t, t)
+
+def norm_event_name(ev):
+    if isinstance(ev, dict):
+        return str(ev.get("name") or ev.get("match_number") or "").strip().lower()
+    return str(ev or "").strip().lower()
+
+def dates_as_str_list(info):
+    return [str(d) for d in info.get("dates", [])]
+
+def get_info_teams(info):
+    return {norm_team_name(x) for x in info.get("teams", [])}
+
+def rows_from_legacy_innings(innings_block, info):
+    rows = []
+    innings_name = list(innings_block.keys())[0]
+    innings = innings_block[innings_name]
+    batting_team = innings.get("team")
+
+    for d in innings.get("deliveries", []):
+        (ball_label, ball) = next(iter(d.items()))
+        over_str, ball_str = ball_label.split(".")
+        over = int(over_str); ball_in_over = int(ball_str)
+
+        runs = ball.get("runs", {}) or {}
+        wicket = ball.get("wicket")
+        wickets_list = ball.get("wickets", [])
+        wicket_event = bool(wicket or wickets_list)
+        dismissal_kind = player_out = None
+        if wicket:
+            dismissal_kind = wicket.get("kind"); player_out = wicket.get("player_out")
+        elif wickets_list:
+            wk = wickets_list[0]; dismissal_kind = wk.get("kind"); player_out = wk.get("player_out")
+
+        extras = ball.get("extras", {}) or {}
+        extras_type = next(iter(extras.keys())) if extras else None
+
+        rows.append({
+            "match_date": (dates_as_str_list(info) or [None])[0],
+            "venue": info.get("venue"),
+            "city": info.get("city"),
+            "event": (info.get("event") or {}).get("name") if isinstance(info.get("event"), dict) else info.get("event"),
+            "toss_winner": (info.get("toss") or {}).get("winner"),
+            "toss_decision": (info.get("toss") or {}).get("decision"),
+            "innings": 1 if "1st" in innings_name else 2,
+            "batting_team": batting_team,
+            "over": over,
+            "ball_in_over": ball_in_over,
+            "striker": ball.get("batter") or ball.get("batsman"),
+            "non_striker": ball.get("non_striker"),
+            "bowler": ball.get("bowler"),
+            "runs_batter": runs.get("batter", 0),
+            "runs_extras": runs.get("extras", 0),
+            "runs_total": runs.get("total", 0),
+            "extras_type": extras_type,
+            "wicket_event": wicket_event,
+            "dismissal_kind": dismissal_kind,
+            "player_out": player_out
+        })
+    return rows
+
+def rows_from_v2_innings(innings_block, info, innings_idx):
+    rows = []
+    batting_team = innings_block.get("team")
+    for over_obj in innings_block.get("overs", []):
+        over = int(over_obj.get("over", 0))
+        for i, ball in enumerate(over_obj.get("deliveries", []), start=1):
+            ball_in_over = int(ball.get("ball", i))
+            runs = ball.get("runs", {}) or {}
+            wicket = ball.get("wicket")
+            wickets_list = ball.get("wickets", [])
+            wicket_event = bool(wicket or wickets_list)
+            dismissal_kind = player_out = None
+            if wicket:
+                dismissal_kind = wicket.get("kind"); player_out = wicket.get("player_out")
+            elif wickets_list:
+                wk = wickets_list[0]; dismissal_kind = wk.get("kind"); player_out = wk.get("player_out")
+            extras = ball.get("extras", {}) or {}
+            extras_type = next(iter(extras.keys())) if extras else None
+
+            rows.append({
+                "match_date": (dates_as_str_list(info) or [None])[0],
+                "venue": info.get("venue"),
+                "city": info.get("city"),
+                "event": (info.get("event") or {}).get("name") if isinstance(info.get("event"), dict) else info.get("event"),
+                "toss_winner": (info.get("toss") or {}).get("winner"),
+                "toss_decision": (info.get("toss") or {}).get("decision"),
+                "innings": innings_idx,
+                "batting_team": batting_team,
+                "over": over,
+                "ball_in_over": ball_in_over,
+                "striker": ball.get("batter"),
+                "non_striker": ball.get("non_striker"),
+                "bowler": ball.get("bowler"),
+                "runs_batter": runs.get("batter", 0),
+                "runs_extras": runs.get("extras", 0),
+                "runs_total": runs.get("total", 0),
+                "extras_type": extras_type,
+                "wicket_event": wicket_event,
+                "dismissal_kind": dismissal_kind,
+                "player_out": player_out
+            })
+    return rows
+
+def flatten_match_to_rows(match_json):
+    info = match_json.get("info", {})
+    all_rows = []
+    innings_list = match_json.get("innings", [])
+    for idx, innings_block in enumerate(innings_list, start=1):
+        if isinstance(innings_block, dict) and "overs" in innings_block:
+            all_rows.extend(rows_from_v2_innings(innings_block, info, idx))
+        else:
+            all_rows.extend(rows_from_legacy_innings(innings_block, info))
+    return info, all_rows
@@ -0,0 +1,315 @@
+"""
+Materialized delivery aggregates keyed by (batter, bowler, phase, season, venue), kept in
+SQLite so matchup, economy and dismissal questions are answered without rescanning deliveries.
+
+Usage:
+  t20-cube update --dataset data/processed/t20i [--db data/processed/t20i_cube.sqlite]
+  t20-cube update --indir data/processed
+  t20-cube matchup --batter "V Kohli" --bowler "Haris Rauf"
+  t20-cube economy --bowler "Haris Rauf" --season 2022
+  t20-cube dismissals --bowler "Haris Rauf" [--phase death]
+
+Tables:
+  cells       one row per key: deliveries, balls_faced (not wides), legal_balls (not wides
+              or no-balls), runs_batter, runs_conceded (bat runs + wides + no-balls), dots,
+              fours, sixes, wides, noballs, wickets (credited to the bowler), outs (striker out)
+  dismissals  one row per key and dismissal_kind; batter is the player out
+  rollup, dismissal_rollup
+              the same sums keyed by (phase, season, venue), used when a query names no player
+  parts       what has been aggregated: matches parts of the dataset, or CSV files with
+              their size/mtime stamp
+New matches are aggregated with vectorized group-bys (`aggregate`) and added to the stored
+sums in one transaction, so `update` after `01 --all` only reads the new parts. If a part
+that was aggregated disappeared or changed (the dataset was rebuilt), the cube is rebuilt.
+A cube holds one source (dataset root or CSV folder); use another --db for another.
+phase follows t20.features.phase_labels. Queries are plain SQL; pandas is imported only to update.
+"""
+import os, time, sqlite3, argparse
+from pathlib import Path
+
+DEFAULT_DB = "data/processed/t20i_cube.sqlite"
+KEYS = ["batter", "bowler", "phase", "season", "venue"]
+MEASURES = ["deliveries", "balls_faced", "legal_balls", "runs_batter", "runs_conceded", "dots",
+            "fours", "sixes", "wides", "noballs", "wickets", "outs"]
+# dismissals that do not count as the bowler's wicket
+NOT_BOWLER = {"run out", "retired hurt", "retired out", "retired not out", "obstructing the field",
+              "handled the ball"}
+INPUT_COLUMNS = ["striker", "bowler", "over", "runs_batter", "runs_extras", "runs_total", "extras_type",
+                 "wicket_event", "dismissal_kind", "player_out"]
+
+# rollups with fewer keys answer queries that do not filter or group by player; smallest first
+CELL_TABLES = {"rollup": ["phase", "season", "venue"], "cells": KEYS}
+DISMISSAL_TABLES = {"dismissal_rollup": ["phase", "season", "venue", "kind"], "dismissals": KEYS + ["kind"]}
+
+def _create(table, keys, measures):
+    return (f"CREATE TABLE IF NOT EXISTS {table} ("
+            + ", ".join([f"{k} TEXT NOT NULL" for k in keys] + [f"{m} INTEGER NOT NULL" for m in measures])
+            + f", PRIMARY KEY ({', '.join(keys)})) WITHOUT ROWID;")
+
+SCHEMA = "\n".join(
+    [_create(t, keys, MEASURES) for t, keys in CELL_TABLES.items()]
+    + [_create(t, keys, ["n"]) for t, keys in DISMISSAL_TABLES.items()]
+) + """
+CREATE TABLE IF NOT EXISTS parts (
+    source TEXT NOT NULL,
+    part TEXT NOT NULL,
+    stamp TEXT NOT NULL,
+    PRIMARY KEY (source, part)
+);
+CREATE INDEX IF NOT EXISTS ix_cells_bowler ON cells (bowler, phase);
+CREATE INDEX IF NOT EXISTS ix_dismissals_bowler ON dismissals (bowler, kind);
+"""
+
+def connect(db_path=DEFAULT_DB):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    con.executescript(SCHEMA)
+    return con
+
+# ---- building ----
+
+def aggregate(df):
+    """(cells, dismissals) frames for deliveries with INPUT_COLUMNS plus season and venue."""
+    import numpy as np, pandas as pd
+    from t20.features import phase_labels
+    num = lambda c: pd.to_numeric(df[c], errors="coerce").fillna(0).to_numpy(dtype="int64")
+    text = lambda c: df[c].astype(object).where(df[c].notna(), "").astype(str).to_numpy()
+    extras = np.char.lower(text("extras_type").astype(str))
+    wide, noball = extras == "wides", extras == "noballs"
+    runs_batter, runs_extras, runs_total = num("runs_batter"), num("runs_extras"), num("runs_total")
+    wicket = df["wicket_event"].astype(bool).to_numpy()
+    kind, striker, player_out = text("dismissal_kind"), text("striker"), text("player_out")
+    keys = {"batter": striker, "bowler": text("bowler"), "phase": phase_labels(num("over")),
+            "season": text("season"), "venue": text("venue")}
+    frame = pd.DataFrame({
+        **keys,
+        "deliveries": 1,
+        "balls_faced": ~wide,
+        "legal_balls": ~(wide | noball),
+        "runs_batter": runs_batter,
+        "runs_conceded": runs_batter + np.where(wide | noball, runs_extras, 0),
+        "dots": runs_total == 0,
+        "fours": runs_batter == 4,
+        "sixes": runs_batter == 6,
+        "wides": wide,
+        "noballs": noball,
+        "wickets": wicket & ~np.isin(kind, list(NOT_BOWLER)),
+        "outs": wicket & (player_out == striker),
+    })
+    cells = frame.groupby(KEYS, sort=False)[MEASURES].sum().reset_index()
+    out = frame.loc[wicket, KEYS].assign(kind=kind[wicket])
+    out["batter"] = np.where(player_out[wicket] != "", player_out[wicket], out["batter"])
+    dismissals = out.groupby(KEYS + ["kind"], sort=False).size().rename("n").reset_index()
+    return cells, dismissals
+
+def _upsert(con, table, frame, cols, keys):
+    names = ", ".join(keys + cols)
+    sql = (f"INSERT INTO {table} ({names}) VALUES ({', '.join('?' * (len(keys) + len(cols)))})"
+           f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET " + ", ".join(f"{c} = {c} + excluded.{c}" for c in cols))
+    con.executemany(sql, frame[keys + cols].itertuples(index=False, name=None))
+
+def add(con, df, source, parts):
+    """Aggregate `df` and add it, recording `parts` ({part: stamp}) of `source`, in one transaction."""
+    cells, dismissals = aggregate(df)
+    with con:
+        for table, keys in CELL_TABLES.items():
+            _upsert(con, table, cells.groupby(keys, sort=False)[MEASURES].sum().reset_index(), MEASURES, keys)
+        for table, keys in DISMISSAL_TABLES.items():
+            _upsert(con, table, dismissals.groupby(keys, sort=False)[["n"]].sum().reset_index(), ["n"], keys)
+        con.executemany("INSERT OR REPLACE INTO parts (source, part, stamp) VALUES (?, ?, ?)",
+                        [(source, p, s) for p, s in parts.items()])
+    return len(cells)
+
+def clear(con):
+    with con:
+        for table in list(CELL_TABLES) + list(DISMISSAL_TABLES) + ["parts"]:
+            con.execute(f"DELETE FROM {table}")
+
+def _plan(con, source, current):
+    """Parts of `current` ({part: stamp}) still to aggregate; clears the cube when it must be rebuilt."""
+    known = {r["part"]: r["stamp"] for r in con.execute("SELECT part, stamp FROM parts WHERE source = ?", (source,))}
+    other = con.execute("SELECT source FROM parts WHERE source != ? LIMIT 1", (source,)).fetchone()
+    if other:
+        raise ValueError(f"cube already holds {other['source']}; use another --db for {source}")
+    if any(current.get(p) != s for p, s in known.items()):
+        clear(con)
+        known = {}
+    return [p for p in sorted(current) if p not in known]
+
+def dataset_parts(root):
+    """{matches part tag: ""}; a DatasetWriter flush writes matches/<tag>.parquet and deliveries/*/<tag>-*.parquet."""
+    path = os.path.join(root, "matches")
+    if not os.path.isdir(path):
+        return {}
+    return {Path(f).stem: "" for f in os.listdir(path) if f.endswith(".parquet")}
+
+def read_dataset_part(root, tag):
+    """Deliveries of one flush with season (from the partition directory) and venue (from its matches)."""
+    import pandas as pd
+    from t20.dataset import _pq
+    _pq()
+    matches = pd.read_parquet(os.path.join(root, "matches", f"{tag}.parquet"), columns=["match_id", "venue"])
+    frames = []
+    for d in sorted(Path(root, "deliveries").glob("season=*")):
+        for f in sorted(d.glob(f"{tag}-*.parquet")):
+            frames.append(pd.read_parquet(f, columns=["match_id"] + INPUT_COLUMNS)
+                          .assign(season=d.name.split("=", 1)[1]))
+    if not frames:
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    df["match_id"] = df["match_id"].astype(str)
+    venues = dict(zip(matches["match_id"].astype(str), matches["venue"]))
+    df["venue"] = df["match_id"].map(venues)
+    return df
+
+def update_dataset(con, root):
+    """Aggregate the matches parts of a columnar dataset not in the cube yet; returns (parts, cells touched)."""
+    source = os.path.abspath(root)
+    todo = _plan(con, source, dataset_parts(root))
+    touched = 0
+    for tag in todo:
+        df = read_dataset_part(root, tag)
+        if df is None:
+            with con:
+                con.execute("INSERT OR REPLACE INTO parts (source, part, stamp) VALUES (?, ?, '')", (source, tag))
+            continue
+        touched += add(con, df, source, {tag: ""})
+    return len(todo), touched
+
+def read_csv_part(path):
+    import pandas as pd
+    header = pd.read_csv(path, nrows=0).columns
+    df = pd.read_csv(path, usecols=[c for c in INPUT_COLUMNS + ["match_date", "venue", "season"] if c in header])
+    if "season" not in df.columns:
+        df["season"] = df["match_date"].astype(str).str[:4] if "match_date" in df.columns else "unknown"
+    if "venue" not in df.columns:
+        df["venue"] = ""
+    return df
+
+def update_csv(con, indir, suffix="_ball_by_ball.csv", batch=200):
+    """Aggregate per-match CSVs not in the cube yet (by size/mtime), `batch` files per transaction."""
+    import pandas as pd
+    source = os.path.abspath(indir)
+    current = {}
+    for p in Path(indir).glob(f"*{suffix}"):
+        st = p.stat()
+        current[p.name] = f"{st.st_size}:{st.st_mtime_ns}"
+    todo = _plan(con, source, current)
+    touched = 0
+    for i in range(0, len(todo), batch):
+        names = todo[i:i + batch]
+        df = pd.concat([read_csv_part(os.path.join(indir, n)) for n in names], ignore_index=True)
+        touched += add(con, df, source, {n: current[n] for n in names})
+    return len(todo), touched
+
+# ---- queries ----
+
+def _select(tables, group=(), batter=None, bowler=None, phase=None, season=None, venue=None):
+    """(table, WHERE clause, params): the smallest of `tables` keyed by every filtered/grouped column."""
+    filters = {"batter": batter, "bowler": bowler, "phase": phase, "season": season, "venue": venue}
+    used = set(group) | {c for c, v in filters.items() if v is not None}
+    table = next(t for t, keys in tables.items() if used <= set(keys))
+    sql, params = [], []
+    for col, val in filters.items():
+        if val is None:
+            continue
+        vals = [str(v) for v in val] if isinstance(val, (list, tuple, set)) else [str(val)]
+        sql.append(f"{col} IN ({', '.join('?' * len(vals))})"); params.extend(vals)
+    return table, (" WHERE " + " AND ".join(sql) if sql else ""), params
+
+def totals(con, group=(), **filters):
+    """Summed measures per `group` (a list of key columns) over the cells matching `filters`."""
+    table, where, params = _select(CELL_TABLES, group, **filters)
+    cols = ", ".join(list(group) + [f"SUM({m}) AS {m}" for m in MEASURES])
+    sql = f"SELECT {cols} FROM {table}{where}"
+    if group:
+        sql += f" GROUP BY {', '.join(group)} ORDER BY {', '.join(group)}"
+    return [dict(r) for r in con.execute(sql, params) if r["deliveries"]]
+
+def _kinds(con, **filters):
+    table, where, params = _select(DISMISSAL_TABLES, ["kind"], **filters)
+    return con.execute(f"SELECT kind, SUM(n) AS n FROM {table}{where} GROUP BY kind ORDER BY n DESC", params)
+
+def _rate(num, den, scale=1.0):
+    return scale * num / den if den else None
+
+def matchup(con, batter, bowler, **filters):
+    """Batter vs bowler: runs, balls, strike rate, dismissals by kind."""
+    t = (totals(con, batter=batter, bowler=bowler, **filters) or [dict.fromkeys(MEASURES, 0)])[0]
+    t = {k: t[k] or 0 for k in MEASURES}
+    kinds = {r["kind"]: r["n"] for r in _kinds(con, batter=batter, bowler=bowler, **filters)}
+    return dict(batter=batter, bowler=bowler, **t, strike_rate=_rate(t["runs_batter"], t["balls_faced"], 100),
+                dismissals=kinds)
+
+def economy_by_phase(con, bowler=None, **filters):
+    """Per phase: legal balls, runs conceded, economy (runs per over), dot %, wickets, balls per wicket."""
+    rows = []
+    for t in totals(con, group=["phase"], bowler=bowler, **filters):
+        rows.append({"phase": t["phase"], "legal_balls": t["legal_balls"], "runs_conceded": t["runs_conceded"],
+                     "economy": _rate(t["runs_conceded"], t["legal_balls"], 6),
+                     "dot_pct": _rate(t["dots"], t["deliveries"], 100),
+                     "wickets": t["wickets"], "strike_rate": _rate(t["legal_balls"], t["wickets"])})
+    return rows
+
+def dismissal_rates(con, **filters):
+    """Per dismissal_kind: count and dismissals per 100 balls faced within `filters`."""
+    balls = (totals(con, **filters) or [{"balls_faced": 0}])[0]["balls_faced"] or 0
+    return [{"kind": r["kind"], "n": r["n"], "per_100_balls": _rate(r["n"], balls, 100)} for r in _kinds(con, **filters)]
+
+def _fmt(v):
+    return f"{v:.2f}" if isinstance(v, float) else ("-" if v is None else str(v))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Aggregate cube of batter/bowler/phase/season/venue delivery totals")
+    ap.add_argument("--db", type=str, default=DEFAULT_DB, help="SQLite cube path")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    up = sub.add_parser("update", help="Aggregate new matches")
+    src = up.add_mutually_exclusive_group(required=True)
+    src.add_argument("--dataset", type=str, help="Columnar dataset root written by 01 --all")
+    src.add_argument("--indir", type=str, help="Folder with *_ball_by_ball.csv files")
+    up.add_argument("--rebuild", action="store_true", help="Drop the cube and aggregate everything again")
+    queries = {
+        "matchup": sub.add_parser("matchup", help="Batter vs bowler totals and dismissals"),
+        "economy": sub.add_parser("economy", help="Economy, dot %% and wickets by phase"),
+        "dismissals": sub.add_parser("dismissals", help="Dismissals per 100 balls by kind"),
+    }
+    for name, q in queries.items():
+        q.add_argument("--batter", type=str, required=name == "matchup", default=None)
+        q.add_argument("--bowler", type=str, required=name == "matchup", default=None)
+        q.add_argument("--phase", choices=("powerplay", "middle", "death"), default=None)
+        q.add_argument("--season", nargs="+", default=None)
+        q.add_argument("--venue", type=str, default=None)
+    args = ap.parse_args(argv)
+
+    con = connect(args.db)
+    if args.cmd == "update":
+        if args.rebuild:
+            clear(con)
+        t0 = time.perf_counter()
+        try:
+            parts, touched = update_dataset(con, args.dataset) if args.dataset else update_csv(con, args.indir)
+        except ValueError as e:
+            ap.error(str(e))
+        n = con.execute("SELECT COUNT(*) FROM cells").fetchone()[0]
+        print(f"[OK] Cube: {args.db} (new parts: {parts}, cells updated: {touched}, cells: {n},"
+              f" {time.perf_counter() - t0:.2f}s)")
+        return
+    filters = {"phase": args.phase, "season": args.season, "venue": args.venue}
+    t0 = time.perf_counter()
+    if args.cmd == "matchup":
+        rows = [matchup(con, args.batter, args.bowler, **filters)]
+    elif args.cmd == "economy":
+        rows = economy_by_phase(con, bowler=args.bowler, batter=args.batter, **filters)
+    else:
+        rows = dismissal_rates(con, batter=args.batter, bowler=args.bowler, **filters)
+    ms = 1000 * (time.perf_counter() - t0)
+    if rows:
+        print("\t".join(rows[0]))
+    for r in rows:
+        print("\t".join(_fmt(v) for v in r.values()))
+    print(f"[OK] {len(rows)} row(s) in {ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Columnar T20I dataset: one `matches` table (a row per match) and a `deliveries`
+table keyed by match_id, stored as Parquet and partitioned by season.
+
+Layout:
+  <root>/matches/part-*.parquet
+  <root>/deliveries/season=<season>/part-*.parquet
+
+Readers take `columns` and `seasons` so downstream stages only load what they use.
+Needs pyarrow (`pip install -e .[parquet]`).
+"""
+import os, shutil, uuid
+import pandas as pd
+
+MATCH_COLUMNS = [
+    "match_id", "season", "match_date", "venue", "city", "event",
+    "toss_winner", "toss_decision", "team1", "team2", "winner",
+]
+DELIVERY_COLUMNS = [
+    "match_id", "season", "innings", "batting_team", "over", "ball_in_over",
+    "striker", "non_striker", "bowler", "runs_batter", "runs_extras", "runs_total",
+    "extras_type", "wicket_event", "dismissal_kind", "player_out",
+]
+# match-level fields repeated on every row of the per-match CSVs
+MATCH_LEVEL_ROW_FIELDS = ["match_date", "venue", "city", "event", "toss_winner", "toss_decision"]
+# column order of the per-match *_ball_by_ball.csv files
+BALL_BY_BALL_COLUMNS = MATCH_LEVEL_ROW_FIELDS + DELIVERY_COLUMNS[2:]
+
+DELIVERY_DTYPES = {
+    "innings": "int8", "over": "int8", "ball_in_over": "int8",
+    "runs_batter": "int8", "runs_extras": "int8", "runs_total": "int8",
+    "wicket_event": "bool",
+}
+CATEGORICAL_COLUMNS = [
+    "match_id", "batting_team", "striker", "non_striker", "bowler",
+    "extras_type", "dismissal_kind", "player_out",
+]
+
+def _pq():
+    try:
+        import pyarrow as pa, pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The columnar dataset needs pyarrow: pip install -e .[parquet]") from e
+    return pa, pq
+
+def season_of(info):
+    season = info.get("season")
+    if not season:
+        dates = info.get("dates") or []
+        season = str(dates[0])[:4] if dates else "unknown"
+    # "2021/22" would create a nested partition directory
+    return str(season).replace("/", "-")
+
+def match_record(match_id, info):
+    event = info.get("event")
+    dates = [str(d) for d in info.get("dates", [])]
+    teams = list(info.get("teams", [])) + [None, None]
+    return {
+        "match_id": match_id,
+        "season": season_of(info),
+        "match_date": (dates or [None])[0],
+        "venue": info.get("venue"),
+        "city": info.get("city"),
+        "event": (event or {}).get("name") if isinstance(event, dict) else event,
+        "toss_winner": (info.get("toss") or {}).get("winner"),
+        "toss_decision": (info.get("toss") or {}).get("decision"),
+        "team1": teams[0],
+        "team2": teams[1],
+        "winner": (info.get("outcome") or {}).get("winner"),
+    }
+
+def delivery_tuples(match_id, season, rows):
+    """Strip the match-level fields from flattened rows; tuples follow DELIVERY_COLUMNS."""
+    keys = DELIVERY_COLUMNS[2:]
+    return [(match_id, season) + tuple(r[k] for k in keys) for r in rows]
+
+def compact_deliveries(df):
+    for col, dtype in DELIVERY_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype == "bool":
+            df[col] = df[col].astype(bool)
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(dtype)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+class DatasetWriter:
+    """Buffers matches and flushes them as Parquet parts every `flush_every` matches."""
+
+    def __init__(self, root, flush_every=500, append=False):
+        if not append:
+            for table in ("matches", "deliveries"):
+                shutil.rmtree(os.path.join(root, table), ignore_errors=True)
+        self.root = root
+        self.flush_every = flush_every
+        self.run_id = uuid.uuid4().hex[:8]
+        self._matches, self._deliveries, self._parts = [], [], 0
+        self.n_matches = self.n_deliveries = 0
+
+    def add(self, record, tuples):
+        self._matches.append(record)
+        self._deliveries.extend(tuples)
+        if len(self._matches) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._matches:
+            return
+        pa, pq = _pq()
+        tag = f"part-{self.run_id}-{self._parts:05d}"
+        os.makedirs(os.path.join(self.root, "matches"), exist_ok=True)
+        matches = pd.DataFrame.from_records(self._matches, columns=MATCH_COLUMNS)
+        pq.write_table(pa.Table.from_pandas(matches, preserve_index=False),
+                       os.path.join(self.root, "matches", f"{tag}.parquet"))
+        if self._deliveries:
+            dels = compact_deliveries(pd.DataFrame.from_records(self._deliveries, columns=DELIVERY_COLUMNS))
+            pq.write_to_dataset(pa.Table.from_pandas(dels, preserve_index=False),
+                                os.path.join(self.root, "deliveries"), partition_cols=["season"],
+                                basename_template=tag + "-{i}.parquet")
+        self.n_matches += len(self._matches); self.n_deliveries += len(self._deliveries)
+        self._matches, self._deliveries = [], []
+        self._parts += 1
+
+    def close(self):
+        self.flush()
+
+def _filters(seasons=None, match_ids=None):
+    filters = []
+    if seasons:
+        filters.append(("season", "in", [str(s).replace("/", "-") for s in seasons]))
+    if match_ids is not None:
+        filters.append(("match_id", "in", [str(m) for m in match_ids]))
+    return filters or None
+
+def read_table(path, columns=None, seasons=None, match_ids=None):
+    _pq()
+    df = pd.read_parquet(path, columns=columns, filters=_filters(seasons, match_ids))
+    if "season" in df.columns:
+        df["season"] = df["season"].astype(str).astype("category")
+    return df
+
+def read_deliveries(root, columns=None, seasons=None, match_ids=None):
+    return read_table(os.path.join(root, "deliveries"), columns, seasons, match_ids)
+
+def read_matches(root, columns=None, seasons=None, match_ids=None):
+    return read_table(os.path.join(root, "matches"), columns, seasons, match_ids)
+
+def list_seasons(root, table="deliveries"):
+    path = os.path.join(root, table)
+    if not os.path.isdir(path):
+        return []
+    return sorted(d.split("=", 1)[1] for d in os.listdir(path) if d.startswith("season="))
+
+def write_partitioned(df, path, partition_cols=("season",), basename=None):
+    pa, pq = _pq()
+    tag = basename or f"part-{uuid.uuid4().hex[:8]}"
+    pq.write_to_dataset(pa.Table.from_pandas(df, preserve_index=False), path,
+                        partition_cols=list(partition_cols), basename_template=tag + "-{i}.parquet")
+
+def to_ball_by_ball(deliveries, matches):
+    """Rebuild the wide per-match CSV layout (match fields repeated per row)."""
+    m = matches[["match_id"] + MATCH_LEVEL_ROW_FIELDS].copy()
+    m["match_id"] = m["match_id"].astype(str)
+    d = deliveries.copy()
+    d["match_id"] = d["match_id"].astype(str)
+    out = d.merge(m, on="match_id", how="left")
+    return out[["match_id"] + [c for c in BALL_BY_BALL_COLUMNS if c in out.columns]]
@@ -0,0 +1,352 @@
+"""
+Extract stage (`t20-extract`, scripts/01_extract_matches.py).
+
+Extract two specific T20I matches (IND–PAK 2022 T20WC and ENG–WI 2016 WT20 Final)
+from a Cricsheet T20I JSON dump into ball-by-ball CSVs.
+Usage:
+  t20-extract --zip t20s_json.zip --outdir outputs/
+If you've already extracted the zip, pass --jsondir <folder> instead of --zip.
+Pass --stream to read members straight from the zip (no extraction to data/t20s_json)
+and --workers N to parse/flatten matches on N processes.
+Pass --all to extract every match into the columnar dataset under <outdir>/t20i
+(see t20.dataset) instead of the two target CSVs; --cube <db> then adds the new matches to
+the aggregate cube (see t20.cube).
+Pass --index <db> to look matches up in the persistent metadata index (see t20.index,
+updated incrementally first) so only the matching files are parsed; with --index,
+--date/--teams/--event select any set of matches (per-match CSVs, or with --all a dataset of
+their own under <outdir>/t20i_select/<hash>, so a selection never replaces the corpus dataset).
+
+`iter_parsed` reads Cricsheet files from a folder or straight from the zip, serially or
+on a process pool (one zip handle per worker), and yields (name, info, rows) in input
+order. `find_targets` runs the scan for the two TARGETS matches and returns their
+ball-by-ball rows in memory; `t20-run` hands them to the feature stage directly.
+Timings, rows and bytes per sub-step go to the run report (t20.instrument).
+Only the standard library is imported up front.
+"""
+import os, json, hashlib, argparse
+from pathlib import Path
+
+from t20.cricsheet import load_json, norm_event_name, dates_as_str_list, get_info_teams, flatten_match_to_rows
+from t20 import instrument
+from t20.instrument import step, file_size, add_arguments, stage_run
+
+TARGETS = [
+    {
+        "label": "IND-PAK 2022 T20WC",
+        "outfile": "IND_PAK_2022_T20WC_ball_by_ball.csv",
+        "date": "2022-10-23",
+        "teams": {"india", "pakistan"},
+        "event_contains_any": ["world cup", "t20 world cup", "icc men's t20 world cup"],
+    },
+    {
+        "label": "ENG-WI 2016 WT20 Final",
+        "outfile": "ENG_WI_2016_WT20_Final_ball_by_ball.csv",
+        "date": "2016-04-03",
+        "teams": {"england", "west indies"},
+        "event_contains_any": ["world twenty20", "icc world twenty20", "wt20", "world t20"],
+    },
+]
+
+def match_strength(info, T):
+    ds = dates_as_str_list(info)
+    ev = norm_event_name(info.get("event"))
+    teams = get_info_teams(info)
+    score = 0
+    if T["date"] in ds:
+        score = max(score, 1)
+        if teams == T["teams"]:
+            score = max(score, 2)
+            if any(s in ev for s in T["event_contains_any"]):
+                score = max(score, 3)
+    return score
+
+# --- match readers (serial or process pool) ---
+_ZF = None
+
+def _init_reader(zip_path):
+    global _ZF
+    if zip_path:
+        import zipfile
+        _ZF = zipfile.ZipFile(zip_path, "r")
+    else:
+        _ZF = None
+
+def read_member(name):
+    if _ZF is not None:
+        return _ZF.read(name)
+    with open(name, "rb") as f:
+        return f.read()
+
+def is_wanted(info):
+    return any(match_strength(info, T) >= 2 for T in TARGETS)
+
+def parse_batch(names, mode="targets"):
+    # "targets": rows are only flattened (and shipped back) for matches that hit a target
+    # "rows":    every match comes back with its flattened rows
+    # "dataset": every match comes back as (match record, compact delivery tuples)
+    out = []
+    for name in names:
+        try:
+            with step("zip_read" if _ZF is not None else "file_read") as s:
+                raw = read_member(name)
+                s.bytes_read += len(raw)
+            with step("json_parse"):
+                match_json = load_json(raw)
+        except Exception:
+            out.append((name, None, None)); continue
+        info = match_json.get("info", {})
+        if mode == "dataset":
+            from t20.dataset import match_record, delivery_tuples
+            with step("flatten") as s:
+                rec = match_record(Path(name).stem, info)
+                rows = delivery_tuples(rec["match_id"], rec["season"], flatten_match_to_rows(match_json)[1])
+                s.rows += len(rows)
+            out.append((name, rec, rows))
+            continue
+        rows = None
+        if mode == "rows" or is_wanted(info):
+            with step("flatten") as s:
+                rows = flatten_match_to_rows(match_json)[1]
+                s.rows += len(rows)
+        out.append((name, info, rows))
+    return out
+
+def _parse_batch_timed(names, mode):
+    """parse_batch in a worker, with its steps sent back for the run report."""
+    with instrument.capture() as rec:
+        out = parse_batch(names, mode)
+    return out, rec.as_dict()
+
+def iter_parsed(names, zip_path=None, workers=1, batch_size=16, mode="targets"):
+    """Yield (name, info, rows) in input order; at most 4 batches per worker are in flight."""
+    batches = (names[i:i + batch_size] for i in range(0, len(names), batch_size))
+    if workers <= 1:
+        _init_reader(zip_path)
+        for b in batches:
+            yield from parse_batch(b, mode)
+        return
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import islice
+    timed = instrument.active()
+    func = _parse_batch_timed if timed else parse_batch
+    with ProcessPoolExecutor(workers, initializer=_init_reader, initargs=(zip_path,)) as ex:
+        pending = deque(ex.submit(func, b, mode) for b in islice(batches, 4 * workers))
+        while pending:
+            done = pending.popleft().result()
+            if timed:
+                done, steps = done
+                instrument.merge(steps)
+            nxt = next(batches, None)
+            if nxt is not None:
+                pending.append(ex.submit(func, nxt, mode))
+            yield from done
+
+def list_zip_members(zip_path):
+    import zipfile
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        return sorted(n for n in zf.namelist() if n.endswith(".json") and "/" not in n)
+
+def find_targets(names, zip_path=None, workers=1, targets=TARGETS):
+    """{outfile: rows} for each target: the first file with the date and teams,
+    else the first file on the date. Targets with no candidate are left out."""
+    found = {}
+    candidates_on_dates = {t["date"]: [] for t in targets}
+
+    for name, info, rows in iter_parsed(names, zip_path, workers):
+        if info is None:
+            continue
+        ds = dates_as_str_list(info)
+        teams = get_info_teams(info)
+
+        for want_date in candidates_on_dates:
+            if want_date in ds:
+                candidates_on_dates[want_date].append((name, teams))
+
+        for T in targets:
+            if T["outfile"] not in found and match_strength(info, T) >= 2:
+                found[T["outfile"]] = rows
+
+    # Fallback to date-only best
+    for T in targets:
+        if T["outfile"] in found:
+            continue
+        cands = candidates_on_dates.get(T["date"], [])
+        best = next((name for name, teams in cands if teams == T["teams"]), cands[0][0] if cands else None)
+        if best:
+            _init_reader(zip_path)
+            found[T["outfile"]] = flatten_match_to_rows(load_json(read_member(best)))[1]
+    return found
+
+def extract_all(names, zip_path, workers, root, append=False):
+    from t20.dataset import DatasetWriter
+    tables = [os.path.join(root, "matches"), os.path.join(root, "deliveries")]
+    size_before = sum(file_size(p) for p in tables) if append else 0
+    writer = DatasetWriter(root, append=append)
+    for name, rec, rows in iter_parsed(names, zip_path, workers, mode="dataset"):
+        if rec is not None:
+            with step("dataset_write") as s:
+                writer.add(rec, rows)
+                s.rows += len(rows)
+    with step("dataset_write") as s:
+        writer.close()
+        s.bytes_written += sum(file_size(p) for p in tables) - size_before
+    print("[OK] Wrote:", root, "(matches:", writer.n_matches, "deliveries:", writer.n_deliveries, ")")
+
+def select_root(outdir, selection):
+    """Dataset root for a filtered --all run: one per selection, beside (never over) <outdir>/t20i."""
+    key = hashlib.sha256(json.dumps(selection, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(outdir, "t20i_select", key)
+
+def extract_selected(names, zip_path, workers, outdir):
+    written = []
+    for name, info, rows in iter_parsed(names, zip_path, workers, mode="rows"):
+        if rows:
+            path = os.path.join(outdir, f"{Path(name).stem}_ball_by_ball.csv")
+            write_csv(rows, path)
+            written.append(path)
+            print("[OK] Wrote:", path, "(rows:", len(rows), ")")
+    return written
+
+def extract_all_incremental(args, names, zip_path, cache):
+    """--all over the whole corpus: append only members that are new since the last run.
+
+    Members are tracked by zip CRC/size (or file size/mtime); if any previously
+    extracted member changed or vanished, the dataset is rebuilt from scratch."""
+    from t20.index import list_members
+    root = os.path.join(args.outdir, "t20i")
+    outputs = [os.path.join(root, "matches"), os.path.join(root, "deliveries")]
+    current = {m: stamp for m, (stamp, _) in list_members(None if args.jsondir else args.zip, args.jsondir).items()}
+    unit = "dataset@" + cache.rel(root)
+    prev = cache.get(unit) if cache.fresh(unit, [], outputs) else None
+    old = (prev or {}).get("members", {})
+    append = bool(old) and all(current.get(m) == stamp for m, stamp in old.items())
+    todo = [n for n in names if Path(n).name not in old] if append else names
+    if append and not todo:
+        print("[SKIP] Up to date:", root)
+        return
+    extract_all(todo, zip_path, args.workers, root, append=append)
+    cache.record(unit, [], outputs, members=current)
+
+# --- index-backed lookup (only the matching files are parsed) ---
+def open_index(args):
+    from t20.index import connect, update, source_key
+    con = connect(args.index)
+    update(con, None if args.jsondir else args.zip, args.jsondir)
+    return con, source_key(None if args.jsondir else args.zip, args.jsondir)
+
+def member_path(args, member):
+    return os.path.join(args.jsondir, member) if args.jsondir else member
+
+def extract_targets_indexed(args, con, source):
+    from t20.index import query
+    zip_path = None if args.jsondir else args.zip
+    _init_reader(zip_path)
+    for T in TARGETS:
+        cands = query(con, source=source, date=T["date"])
+        # same pick as the full scan: first file on the date with the target teams, else first on the date
+        best = next((r for r in cands if r["teams"] == T["teams"]), cands[0] if cands else None)
+        if best:
+            _, rows = flatten_match_to_rows(load_json(read_member(member_path(args, best["member"]))))
+            write_csv(rows, os.path.join(args.outdir, T["outfile"]))
+
+def list_sources(args):
+    """Return (names, zip_path): file paths for a JSON dir, member names when streaming the zip."""
+    if args.jsondir:
+        return [str(p) for p in sorted(Path(args.jsondir).glob("*.json"))], None
+    if args.stream:
+        return list_zip_members(args.zip), args.zip
+    import zipfile
+    json_dir = Path("data/t20s_json")
+    json_dir.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(args.zip, "r") as zf:
+        zf.extractall(json_dir)
+    return [str(p) for p in sorted(json_dir.glob("*.json"))], None
+
+def write_csv(rows, path):
+    if not rows: return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    import csv
+    with step("csv_write") as s:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        s.rows += len(rows)
+        s.bytes_written += file_size(path)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Extract Cricsheet T20I matches into ball-by-ball CSVs or the columnar dataset")
+    ap.add_argument("--zip", type=str, default="t20s_json.zip", help="Path to Cricsheet T20I zip")
+    ap.add_argument("--jsondir", type=str, default=None, help="If provided, skip unzip and read JSONs from this dir")
+    ap.add_argument("--outdir", type=str, default="outputs", help="Where to save CSVs")
+    ap.add_argument("--stream", action="store_true", help="Read JSON members straight from --zip (no extraction)")
+    ap.add_argument("--workers", type=int, default=1, help="Processes used to parse/flatten matches")
+    ap.add_argument("--all", action="store_true", help="Extract every match into the columnar dataset <outdir>/t20i")
+    ap.add_argument("--cube", type=str, default=None, help="With --all: also add new matches to this aggregate cube (t20.cube)")
+    ap.add_argument("--index", type=str, default=None, help="SQLite match index used to select files")
+    ap.add_argument("--date", type=str, default=None, help="With --index: match date (YYYY-MM-DD)")
+    ap.add_argument("--teams", nargs=2, default=None, metavar=("TEAM_A", "TEAM_B"), help="With --index: team pair")
+    ap.add_argument("--event", type=str, default=None, help="With --index: event name substring")
+    ap.add_argument("--manifest", type=str, default="manifest.json", help="Manifest holding the stage cache")
+    ap.add_argument("--force", action="store_true", help="Ignore the cache and redo all work")
+    add_arguments(ap)
+    args = ap.parse_args(argv)
+    if (args.date or args.teams or args.event) and not args.index:
+        ap.error("--date/--teams/--event need --index")
+    with stage_run("extract", args, argv):
+        _run(args)
+
+def _run(args):
+    from t20.cache import StageCache, module_files
+    cache = StageCache("extract", module_files("cricsheet", "extract", "dataset", "index"),
+                       params={"targets": TARGETS}, manifest=args.manifest, force=args.force)
+    source = args.jsondir or args.zip
+    filtered = bool(args.date or args.teams or args.event)
+    if args.all and not filtered:
+        names, zip_path = list_sources(args)
+        extract_all_incremental(args, names, zip_path, cache)
+        cache.save()
+        if args.cube:
+            from t20.cube import connect, update_dataset
+            with step("cube_update") as s:
+                parts, s.rows = update_dataset(connect(args.cube), os.path.join(args.outdir, "t20i"))
+            print("[OK] Cube:", args.cube, "(new parts:", parts, ")")
+        return
+
+    selection = {"date": args.date, "teams": sorted(args.teams or []), "event": args.event, "all": args.all}
+    unit = ("select:" + json.dumps(selection, sort_keys=True) if filtered else "targets") + "@" + cache.rel(args.outdir)
+    if cache.fresh(unit, [source]):
+        print("[SKIP] Up to date:", unit, "from", source)
+        return
+
+    if args.index:
+        from t20.index import query
+        con, src = open_index(args)
+        if not filtered:
+            extract_targets_indexed(args, con, src)
+            cache.record(unit, [source], [os.path.join(args.outdir, T["outfile"]) for T in TARGETS])
+            cache.save()
+            return
+        hits = query(con, source=src, date=args.date, teams=args.teams, event=args.event)
+        names = [member_path(args, r["member"]) for r in hits]
+        zip_path = None if args.jsondir else args.zip
+        if args.all:
+            root = select_root(args.outdir, selection)
+            extract_all(names, zip_path, args.workers, root)
+            written = [os.path.join(root, "matches"), os.path.join(root, "deliveries")]
+        else:
+            written = extract_selected(names, zip_path, args.workers, args.outdir)
+        cache.record(unit, [source], written)
+        cache.save()
+        return
+
+    names, zip_path = list_sources(args)
+    for outfile, rows in find_targets(names, zip_path, args.workers).items():
+        write_csv(rows, os.path.join(args.outdir, outfile))
+
+    cache.record(unit, [source], [os.path.join(args.outdir, T["outfile"]) for T in TARGETS])
+    cache.save()
+
+if __name__ == "__main__":
+    main()
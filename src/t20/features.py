@@ -0,0 +1,140 @@
+"""
+Match-state features for ball-by-ball deliveries.
+
+`add_match_state_features` takes one match or thousands of them: when a `match_id`
+column is present every cumulative column, the first-innings target, CRR and RRR are
+computed per (match_id, innings) with grouped, vectorised operations.
+
+`StreamingFeatures` computes the same columns chunk by chunk (see `read_csv_chunks`
+for compact dtypes), carrying the running totals of the current match across chunk
+boundaries so peak memory is bounded by the chunk size. Input must already be in
+delivery order (match, innings, over, ball), as the extractor writes it.
+"""
+import numpy as np
+import pandas as pd
+
+INT_COLUMNS = ["innings", "over", "ball_in_over", "runs_batter", "runs_extras", "runs_total"]
+
+PHASES = ("powerplay", "middle", "death")
+
+def phase_from_over(over):
+    if 1 <= over <= 6:
+        return "powerplay"
+    if 7 <= over <= 15:
+        return "middle"
+    return "death"
+
+def phase_codes(over):
+    """0/1/2 = powerplay/middle/death of the `over` column, as phase_from_over; the one phase
+    mapping of the feature stage, the chase simulator and the cube."""
+    over = np.asarray(over)
+    return np.where((over >= 1) & (over <= 6), 0, np.where((over >= 7) & (over <= 15), 1, 2))
+
+def phase_labels(over):
+    """Vectorised phase_from_over."""
+    return np.asarray(PHASES)[phase_codes(over)]
+
+# compact dtypes for reading ball-by-ball / feature CSVs
+COMPACT_DTYPES = {
+    "match_id": "category", "innings": "int8", "over": "int8", "ball_in_over": "int8",
+    "runs_batter": "int8", "runs_extras": "int8", "runs_total": "int8",
+    "wicket_event": "bool", "legal_ball": "bool",
+    "innings_runs": "int16", "innings_wkts": "int8", "balls_bowled_legal": "int16", "balls_remaining": "int16",
+    "match_date": "category", "venue": "category", "city": "category", "event": "category",
+    "toss_winner": "category", "toss_decision": "category", "batting_team": "category",
+    "striker": "category", "non_striker": "category", "bowler": "category",
+    "extras_type": "category", "dismissal_kind": "category", "player_out": "category", "phase": "category",
+}
+COUNTER_DTYPES = {"innings_runs": "int16", "innings_wkts": "int8", "balls_bowled_legal": "int16", "balls_remaining": "int16"}
+
+def read_csv_chunks(path, chunksize=100_000, usecols=None):
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {c: t for c, t in COMPACT_DTYPES.items() if c in header}
+    return pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize)
+
+def _fill_extras(extras):
+    if isinstance(extras.dtype, pd.CategoricalDtype):
+        if "" not in extras.cat.categories:
+            extras = extras.cat.add_categories("")
+        return extras.fillna("")
+    return extras.fillna("")
+
+def add_match_state_features(df):
+    df = df.copy()
+    for col in INT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+
+    match_keys = ["match_id"] if "match_id" in df.columns else []
+    df.sort_values(match_keys + ["innings","over","ball_in_over"], inplace=True, ignore_index=True)
+    df["phase"] = phase_labels(df["over"].to_numpy())
+    df["extras_type"] = _fill_extras(df["extras_type"])
+    df["legal_ball"] = ~df["extras_type"].str.lower().eq("wides").to_numpy(dtype=bool)
+    df["wicket_event"] = df["wicket_event"].astype(bool)
+    by_innings = df.groupby(match_keys + ["innings"], sort=False, observed=True)
+    df["innings_runs"] = by_innings["runs_total"].cumsum()
+    df["innings_wkts"] = by_innings["wicket_event"].cumsum()
+    df["balls_bowled_legal"] = by_innings["legal_ball"].cumsum()
+    df["balls_remaining"] = 120 - df["balls_bowled_legal"]
+
+    first_innings_runs = df["runs_total"].where(df["innings"] == 1, 0)
+    if match_keys:
+        first_innings_total = first_innings_runs.groupby(df["match_id"], sort=False, observed=True).transform("sum")
+    else:
+        first_innings_total = first_innings_runs.sum()
+    target_to_win = first_innings_total + 1
+    chase = df["innings"] == 2
+    df["target_runs"] = np.where(chase, target_to_win, np.nan)
+    df["runs_remaining"] = np.where(chase, np.maximum(target_to_win - df["innings_runs"], 0), np.nan)
+    safe_balls = df["balls_bowled_legal"].replace(0, np.nan)
+    df["CRR"] = (df["innings_runs"] * 6.0) / safe_balls
+    safe_rem_balls = df["balls_remaining"].replace(0, np.nan)
+    df["RRR"] = np.where(chase, (df["runs_remaining"] * 6.0) / safe_rem_balls, np.nan)
+    for col in ["CRR","RRR"]:
+        df[col] = df[col].replace([np.inf, -np.inf], np.nan)
+    return df
+
+class StreamingFeatures:
+    """Chunked add_match_state_features; call `process` on consecutive chunks in order."""
+    STATE = ["innings_runs", "innings_wkts", "balls_bowled_legal"]
+
+    def __init__(self):
+        self.carry = pd.DataFrame(columns=self.STATE, index=pd.MultiIndex.from_tuples([], names=["m", "i"]), dtype="int64")
+
+    def process(self, df):
+        df = df.reset_index(drop=True)
+        for col in INT_COLUMNS:
+            dtype = COMPACT_DTYPES[col]
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(dtype)
+        match = df["match_id"].astype(str).to_numpy() if "match_id" in df.columns else np.full(len(df), "")
+        key = pd.MultiIndex.from_arrays([match, df["innings"].to_numpy()], names=["m", "i"])
+
+        df["phase"] = phase_labels(df["over"].to_numpy())
+        df["extras_type"] = _fill_extras(df["extras_type"])
+        df["legal_ball"] = ~df["extras_type"].str.lower().eq("wides").to_numpy(dtype=bool)
+        df["wicket_event"] = df["wicket_event"].astype(bool)
+        by_innings = df.groupby([match, df["innings"].to_numpy()], sort=False)
+        offset = self.carry.reindex(key).fillna(0).to_numpy(dtype="int64")
+        df["innings_runs"] = by_innings["runs_total"].cumsum().to_numpy() + offset[:, 0]
+        df["innings_wkts"] = by_innings["wicket_event"].cumsum().to_numpy() + offset[:, 1]
+        df["balls_bowled_legal"] = by_innings["legal_ball"].cumsum().to_numpy() + offset[:, 2]
+        df["balls_remaining"] = 120 - df["balls_bowled_legal"]
+
+        # running totals after this chunk; innings 1 of a match always precedes innings 2
+        last = pd.DataFrame(df[self.STATE].to_numpy(), index=key, columns=self.STATE)
+        last = last[~last.index.duplicated(keep="last")]
+        carry = pd.concat([self.carry[~self.carry.index.isin(last.index)], last])
+        first_key = pd.MultiIndex.from_arrays([match, np.ones(len(df), dtype="int64")], names=["m", "i"])
+        first_innings_total = carry["innings_runs"].reindex(first_key).fillna(0).to_numpy(dtype="int64")
+        self.carry = carry[carry.index.get_level_values("m") == match[-1]] if len(df) else carry
+
+        target_to_win = first_innings_total + 1
+        chase = (df["innings"] == 2).to_numpy()
+        df["target_runs"] = np.where(chase, target_to_win, np.nan)
+        df["runs_remaining"] = np.where(chase, np.maximum(target_to_win - df["innings_runs"], 0), np.nan)
+        safe_balls = df["balls_bowled_legal"].replace(0, np.nan)
+        df["CRR"] = (df["innings_runs"] * 6.0) / safe_balls
+        safe_rem_balls = df["balls_remaining"].replace(0, np.nan)
+        df["RRR"] = np.where(chase, (df["runs_remaining"] * 6.0) / safe_rem_balls, np.nan)
+        for col in ["CRR","RRR"]:
+            df[col] = df[col].replace([np.inf, -np.inf], np.nan)
+        return df.astype(COUNTER_DTYPES)
@@ -0,0 +1,316 @@
+"""
+Figure rendering for the WP outputs.
+
+Figures are drawn with the object-oriented API on an Agg canvas (no pyplot state),
+so they can be rendered in worker processes. A render job is a small picklable tuple
+`(kind, path, title, data)` where `data` holds only the arrays the figure needs;
+`render_jobs` draws a list of jobs on a process pool. "wp_overlay" / "wp_multiples" draw
+the many-match timelines aggregated by t20.timelines (quantile bands plus one
+LineCollection of sampled matches per panel), so their cost does not grow with the corpus.
+
+`match_label` / `match_tag` turn an enriched chase into a title such as
+"India vs Pakistan (MCG 2022)" and a file tag such as "ind_pak_2022", so the
+Figure X / Figure Y pair can be drawn for any match; `main` is the Figure X/Y stage
+(`t20-fig-indpak`, scripts/04_figures_ind_pak.py):
+  t20-fig-indpak --infile outputs/wp_outputs/IND_PAK_2022_T20WC_ball_by_ball_features_wp_enriched.csv
+  t20-fig-indpak --indir outputs/wp_outputs --outdir outputs/figures --workers 8
+The defending side is the enriched CSV's defending_team (the team that batted first)
+unless --teams is given. Figures are skipped
+while the CSV they were drawn from is unchanged; drawing time goes to the run report
+(t20.instrument). numpy, pandas and matplotlib are
+imported only when something is drawn.
+"""
+import os, argparse
+
+from t20 import instrument
+from t20.instrument import step, file_size, add_arguments, stage_run
+
+DPI = 200
+
+def _new_figure(figsize):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+def _finish(fig, ax, path, dpi, legend=True):
+    ax.grid(True, linestyle="--", alpha=0.6)
+    if legend:
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+
+def plot_calibration(data, title, path, dpi=DPI):
+    import numpy as np
+    fig, ax = _new_figure((5, 5))
+    ax.plot([0, 1], [0, 1], "--", label="Perfect calibration")
+    mask = np.asarray(data["count"]) > 0
+    ax.plot(np.asarray(data["pred_mean"])[mask], np.asarray(data["obs_rate"])[mask], marker="o", label="Model")
+    ax.set_xlabel("Predicted WP"); ax.set_ylabel("Observed Win Rate"); ax.set_title(title)
+    _finish(fig, ax, path, dpi)
+
+def plot_wp_timeline(data, title, path, dpi=DPI):
+    import numpy as np
+    fig, ax = _new_figure((9, 4))
+    x = np.arange(len(data["wp_pred"]))
+    ax.plot(x, data["wp_pred"], label="WP (placeholder)")
+    if data.get("wp_opt") is not None: ax.plot(x, data["wp_opt"], label="WP (best simulated policy)")
+    ax.set_xlabel("Delivery index (2nd innings)"); ax.set_ylabel("Win Probability"); ax.set_title(title)
+    _finish(fig, ax, path, dpi)
+
+def plot_delta_hist(data, title, path, dpi=DPI):
+    fig, ax = _new_figure((5, 4))
+    ax.hist(data["deltas"], bins=20)
+    ax.set_xlabel("ΔWP (optimized − actual)"); ax.set_ylabel("Count"); ax.set_title(title)
+    _finish(fig, ax, path, dpi, legend=False)
+
+def plot_figure_x(data, title, path, dpi=DPI):
+    import numpy as np
+    fig, ax = _new_figure((10, 4.5))
+    x = np.arange(data["n"])
+    if data.get("wp_pred") is not None: ax.plot(x, data["wp_pred"], label="WP (model)")
+    if data.get("wp_opt") is not None:  ax.plot(x, data["wp_opt"], label="WP (optimized)")
+    ax.set_xlabel("Delivery index (2nd innings)"); ax.set_ylabel("Win Probability"); ax.set_title(title)
+    _finish(fig, ax, path, dpi)
+
+def plot_figure_y(data, title, path, dpi=DPI):
+    fig, ax = _new_figure((6.5, 4.2))
+    ax.hist(data["deltas"], bins=20)
+    ax.set_xlabel("ΔWP"); ax.set_ylabel("Count"); ax.set_title(title)
+    _finish(fig, ax, path, dpi, legend=False)
+
+def _timeline_panel(ax, data, label_lines=True):
+    """Quantile bands, median and a LineCollection of sampled matches (data from t20.timelines)."""
+    from matplotlib.collections import LineCollection
+    balls, bands = data["balls"], data["bands"]
+    if data["lines"]:
+        ax.add_collection(LineCollection(data["lines"], colors="tab:gray", linewidths=0.5, alpha=data.get("alpha", 0.15),
+                                         label=f"{len(data['lines'])} of {data['n']} matches" if label_lines else None))
+    if data["n"]:
+        ax.fill_between(balls, bands[0.1], bands[0.9], color="tab:blue", alpha=0.15, linewidth=0, label="10–90%")
+        ax.fill_between(balls, bands[0.25], bands[0.75], color="tab:blue", alpha=0.3, linewidth=0, label="25–75%")
+        ax.plot(balls, bands[0.5], color="tab:blue", linewidth=1.5, label="Median")
+    ax.set_xlim(0, balls[-1]); ax.set_ylim(0, 1)
+
+def plot_wp_overlay(data, title, path, dpi=DPI):
+    fig, ax = _new_figure((10, 4.5))
+    _timeline_panel(ax, data)
+    ax.set_xlabel("Legal balls bowled (2nd innings)"); ax.set_ylabel("Win Probability"); ax.set_title(title)
+    _finish(fig, ax, path, dpi)
+
+def plot_wp_multiples(data, title, path, dpi=DPI):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    panels, ncols = data["panels"], data["ncols"]
+    nrows = max(1, -(-len(panels) // ncols))
+    fig = Figure(figsize=(3.2 * ncols, 2.4 * nrows + 0.6))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(nrows, ncols, sharex=True, sharey=True, squeeze=False).ravel()
+    for ax, panel in zip(axes, panels):
+        _timeline_panel(ax, panel, label_lines=False)
+        ax.set_title(f"{panel['title']} (n={panel['n']})", fontsize=9)
+        ax.grid(True, linestyle="--", alpha=0.6)
+    for ax in axes[len(panels):]:
+        ax.set_visible(False)
+    fig.supxlabel("Legal balls bowled (2nd innings)"); fig.supylabel("Win Probability"); fig.suptitle(title)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+
+PLOTS = {
+    "calibration": plot_calibration,
+    "timeline": plot_wp_timeline,
+    "delta_hist": plot_delta_hist,
+    "figure_x": plot_figure_x,
+    "figure_y": plot_figure_y,
+    "wp_overlay": plot_wp_overlay,
+    "wp_multiples": plot_wp_multiples,
+}
+
+def render(job, dpi=DPI):
+    kind, path, title, data = job
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with step("plotting") as s:
+        PLOTS[kind](data, title, path, dpi)
+        s.rows += 1; s.bytes_written += file_size(path)
+    return path
+
+def _render_star(args):
+    return render(*args)
+
+def _render_timed(args):
+    """render in a worker, with its steps sent back for the run report."""
+    with instrument.capture() as rec:
+        path = render(*args)
+    return path, rec.as_dict()
+
+def render_jobs(jobs, workers=None, dpi=DPI):
+    """Draw every job, on a process pool when there is more than one; returns the paths."""
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        return [render(job, dpi) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+    timed = instrument.active()
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+        done = list(ex.map(_render_timed if timed else _render_star, [(job, dpi) for job in jobs], chunksize=4))
+    if not timed:
+        return done
+    for _, steps in done:
+        instrument.merge(steps)
+    return [path for path, _ in done]
+
+# ---- data for the figures ----
+
+WP_FIGURES = {"calibration": "Calibration", "timeline": "WP Timeline", "delta_hist": "ΔWP Histogram"}
+
+def wp_figure_jobs(base, outdir, data, kinds=None):
+    """Jobs for the per-file figures of `base` (a features file stem) that have data."""
+    return [(k, os.path.join(outdir, f"{base}_{k}.png"), f"{WP_FIGURES[k]} – {base}", data[k])
+            for k in (kinds or WP_FIGURES) if k in data]
+
+def wp_figure_data(df_opt, cal=None):
+    """Arrays for the per-file calibration / timeline / ΔWP figures of an enriched chase."""
+    data = {}
+    if cal is not None:
+        data["calibration"] = {c: cal[c].to_numpy() for c in ("pred_mean", "obs_rate", "count")}
+    if df_opt is not None and "wp_pred" in df_opt.columns:
+        data["timeline"] = {
+            "wp_pred": df_opt["wp_pred"].to_numpy(),
+            "wp_opt": df_opt["wp_opt"].to_numpy() if "wp_opt" in df_opt.columns else None,
+        }
+    if df_opt is not None and "wp_delta" in df_opt.columns:
+        data["delta_hist"] = {"deltas": df_opt["wp_delta"].dropna().to_numpy()}
+    return data
+
+def match_figure_data(ch):
+    """Arrays for Figure X / Figure Y of one chase (innings-2 rows in delivery order)."""
+    import numpy as np
+    x = {
+        "n": len(ch),
+        "wp_pred": ch["wp_pred"].to_numpy() if "wp_pred" in ch.columns else None,
+        "wp_opt": ch["wp_opt"].to_numpy() if "wp_opt" in ch.columns else None,
+    }
+    if "wp_delta" in ch.columns:
+        deltas = ch["wp_delta"].dropna().to_numpy()
+    elif "wp_pred" in ch.columns:
+        deltas = np.diff(ch["wp_pred"].to_numpy())
+    else:
+        deltas = np.array([0.0])
+    return {"figure_x": x, "figure_y": {"deltas": deltas}}
+
+def chases(df):
+    """(match_id or None, innings-2 rows in delivery order) for each match in an enriched frame."""
+    ch = df[df["innings"] == 2].sort_values(["over","ball_in_over"], kind="stable")
+    if "match_id" not in ch.columns:
+        return [(None, ch.reset_index(drop=True))]
+    return [(m, part.reset_index(drop=True)) for m, part in ch.groupby("match_id", sort=False, observed=True)]
+
+def figure_xy_jobs(ch, outdir, teams=None, tag=None):
+    """Figure X / Figure Y jobs for one chase, titled and named from the match."""
+    tag, label = tag or match_tag(ch, teams), match_label(ch, teams)
+    data = match_figure_data(ch)
+    return [
+        ("figure_x", os.path.join(outdir, f"figure_x_wp_timeline_{tag}.png"),
+         f"Figure X: WP Timeline – {label}", data["figure_x"]),
+        ("figure_y", os.path.join(outdir, f"figure_y_delta_wp_histogram_{tag}.png"),
+         f"Figure Y: ΔWP Histogram – {label}", data["figure_y"]),
+    ]
+
+def _first(ch, col):
+    if col not in ch.columns:
+        return None
+    values = ch[col].dropna()
+    return str(values.iloc[0]) if len(values) else None
+
+def match_teams(ch, teams=None):
+    """(chasing, defending) team names; the defending side is the WP stage's defending_team column."""
+    if teams:
+        return tuple(teams)
+    chasing = _first(ch, "batting_team")
+    defending = _first(ch, "defending_team")
+    if defending is None:
+        # enriched CSVs from before defending_team: the toss is the only hint
+        toss = _first(ch, "toss_winner")
+        defending = toss if toss and toss != chasing else None
+    return chasing, defending
+
+def _team_code(team):
+    """"India" -> "ind", "West Indies" -> "wi"."""
+    words = team.split()
+    return "".join(w[0] for w in words) if len(words) > 1 else team[:3]
+
+def _venue_short(venue):
+    words = [w for w in venue.split(",")[0].split() if w[:1].isupper()]
+    return "".join(w[0] for w in words) if len(words) > 1 else venue.split(",")[0]
+
+def match_label(ch, teams=None):
+    chasing, defending = match_teams(ch, teams)
+    who = f"{chasing} vs {defending}" if defending else f"{chasing} chase"
+    date, venue = _first(ch, "match_date"), _first(ch, "venue")
+    where = " ".join(p for p in (_venue_short(venue) if venue else None, date[:4] if date else None) if p)
+    return f"{who} ({where})" if where else who
+
+def match_tag(ch, teams=None):
+    chasing, defending = match_teams(ch, teams)
+    date = _first(ch, "match_date")
+    parts = [_team_code(t) for t in (chasing, defending) if t] + ([date[:4]] if date else [])
+    return "_".join(parts).lower().replace(" ", "") or "match"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Draw Figure X (WP timeline) and Figure Y (ΔWP histogram) per match")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--infile", type=str, nargs="+", help="Enriched CSV(s) from 03_wp_pipeline.py")
+    src.add_argument("--indir", type=str, help="Folder with *_wp_enriched.csv files")
+    ap.add_argument("--outdir", type=str, default=None)
+    ap.add_argument("--teams", nargs=2, default=None, metavar=("CHASING", "DEFENDING"),
+                    help="Team names for titles/file names (default: from the data)")
+    ap.add_argument("--workers", type=int, default=None, help="Processes for drawing (default: all cores)")
+    ap.add_argument("--manifest", type=str, default="manifest.json", help="Manifest holding the stage cache")
+    ap.add_argument("--force", action="store_true", help="Ignore the cache and redraw")
+    add_arguments(ap)
+    args = ap.parse_args(argv)
+    with stage_run("figures", args, argv):
+        _run(args)
+
+def _run(args):
+    if args.indir:
+        infiles = sorted(os.path.join(args.indir, f) for f in os.listdir(args.indir) if f.endswith("_wp_enriched.csv"))
+    else:
+        infiles = args.infile
+
+    from t20.cache import StageCache, module_files
+    cache = StageCache("figures_ind_pak", module_files("figures"),
+                       params={"dpi": 200, "teams": args.teams}, manifest=args.manifest, force=args.force)
+    import pandas as pd
+    jobs, units, tags = [], [], {}
+    for infile in infiles:
+        outdir = args.outdir or os.path.dirname(infile)
+        unit = f"{cache.rel(infile)}@{cache.rel(outdir)}"
+        if cache.fresh(unit, [infile]):
+            for out in cache.get(unit)["outputs"]:
+                print("[SKIP] Up to date:", out)
+            continue
+        outputs = []
+        with step("csv_read") as s:
+            df = pd.read_csv(infile)
+            s.rows += len(df); s.bytes_read += file_size(infile)
+        for key, ch in chases(df):
+            tag = match_tag(ch, args.teams)
+            # same teams and year twice (e.g. group game and final): keep both
+            tags[tag] = tags.get(tag, 0) + 1
+            if tags[tag] > 1:
+                tag = f"{tag}_{key if key is not None else tags[tag]}"
+            xy = figure_xy_jobs(ch, outdir, args.teams, tag)
+            jobs += xy
+            outputs += [path for _, path, _, _ in xy]
+        units.append((unit, infile, outputs))
+
+    for path in render_jobs(jobs, args.workers):
+        print("[OK] Saved:", path)
+    for unit, infile, outputs in units:
+        cache.record(unit, [infile], outputs)
+    cache.save()
+
+if __name__ == "__main__":
+    main()
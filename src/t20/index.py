@@ -0,0 +1,184 @@
+"""
+Persistent SQLite index of Cricsheet match metadata (the `info` block of every file),
+so matches can be looked up by date, team pair or event without parsing deliveries.
+
+Usage:
+  t20-index update --zip data/raw/t20s_json.zip [--db data/processed/t20i_index.sqlite]
+  t20-index update --jsondir data/t20s_json
+  t20-index query --date 2022-10-23 --teams india pakistan --event "world cup"
+
+`update` is incremental: members are re-read only when their CRC/size (zip) or
+size/mtime (directory) changed, and members that disappeared are dropped.
+"""
+import os, json, sqlite3, argparse
+from pathlib import Path
+
+from t20.cricsheet import read_info, norm_team_name, norm_event_name, dates_as_str_list
+
+DEFAULT_DB = "data/processed/t20i_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    source TEXT NOT NULL,
+    member TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    stamp TEXT NOT NULL,
+    offset INTEGER,
+    first_date TEXT,
+    dates TEXT,
+    team1 TEXT,
+    team2 TEXT,
+    event TEXT,
+    venue TEXT,
+    city TEXT,
+    season TEXT,
+    PRIMARY KEY (source, member)
+);
+CREATE TABLE IF NOT EXISTS match_dates (
+    source TEXT NOT NULL,
+    member TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_match_dates_date ON match_dates (date);
+CREATE INDEX IF NOT EXISTS ix_match_dates_member ON match_dates (source, member);
+CREATE INDEX IF NOT EXISTS ix_matches_teams ON matches (team1, team2);
+"""
+
+def connect(db_path=DEFAULT_DB):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    con = sqlite3.connect(db_path)
+    con.row_factory = sqlite3.Row
+    con.executescript(SCHEMA)
+    return con
+
+def source_key(zip_path=None, jsondir=None):
+    return os.path.abspath(zip_path or jsondir)
+
+def list_members(zip_path=None, jsondir=None):
+    """Return {member: (stamp, offset)} for the top-level *.json files of a zip or directory."""
+    if zip_path:
+        import zipfile
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            return {
+                zi.filename: (f"{zi.CRC:08x}:{zi.file_size}", zi.header_offset)
+                for zi in zf.infolist()
+                if zi.filename.endswith(".json") and "/" not in zi.filename
+            }
+    out = {}
+    for p in Path(jsondir).glob("*.json"):
+        st = p.stat()
+        out[p.name] = (f"{st.st_size}:{st.st_mtime_ns}", None)
+    return out
+
+def info_record(info):
+    teams = sorted(norm_team_name(x) for x in info.get("teams", [])) + [None, None]
+    ds = dates_as_str_list(info)
+    return {
+        "first_date": (ds or [None])[0],
+        "dates": json.dumps(ds),
+        "team1": teams[0],
+        "team2": teams[1],
+        "event": norm_event_name(info.get("event")),
+        "venue": info.get("venue"),
+        "city": info.get("city"),
+        "season": str(info.get("season") or "") or None,
+    }
+
+def update(con, zip_path=None, jsondir=None):
+    """Bring the index for one source up to date; returns (added_or_changed, removed)."""
+    source = source_key(zip_path, jsondir)
+    current = list_members(zip_path, jsondir)
+    known = {r["member"]: r["stamp"] for r in con.execute(
+        "SELECT member, stamp FROM matches WHERE source = ?", (source,))}
+    stale = [m for m, (stamp, _) in current.items() if known.get(m) != stamp]
+    removed = [m for m in known if m not in current]
+
+    import zipfile
+    zf = zipfile.ZipFile(zip_path, "r") if zip_path else None
+    try:
+        with con:
+            for member in removed + stale:
+                con.execute("DELETE FROM matches WHERE source = ? AND member = ?", (source, member))
+                con.execute("DELETE FROM match_dates WHERE source = ? AND member = ?", (source, member))
+            for member in sorted(stale):
+                if zf is not None:
+                    raw = zf.read(member)
+                else:
+                    with open(os.path.join(jsondir, member), "rb") as f:
+                        raw = f.read()
+                try:
+                    info = read_info(raw)
+                except Exception:
+                    continue
+                stamp, offset = current[member]
+                rec = info_record(info)
+                con.execute(
+                    "INSERT INTO matches (source, member, match_id, stamp, offset, first_date, dates,"
+                    " team1, team2, event, venue, city, season)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, member, Path(member).stem, stamp, offset, rec["first_date"], rec["dates"],
+                     rec["team1"], rec["team2"], rec["event"], rec["venue"], rec["city"], rec["season"]),
+                )
+                con.executemany(
+                    "INSERT INTO match_dates (source, member, date) VALUES (?, ?, ?)",
+                    [(source, member, d) for d in json.loads(rec["dates"])],
+                )
+    finally:
+        if zf is not None:
+            zf.close()
+    return len(stale), len(removed)
+
+def query(con, source=None, date=None, teams=None, event=None):
+    """Matches ordered by member name; `teams` is a pair of (raw or normalised) team names."""
+    sql = ["SELECT m.* FROM matches m WHERE 1 = 1"]
+    params = []
+    if source:
+        sql.append("AND m.source = ?"); params.append(source)
+    if date:
+        sql.append("AND EXISTS (SELECT 1 FROM match_dates d"
+                   " WHERE d.source = m.source AND d.member = m.member AND d.date = ?)")
+        params.append(str(date))
+    if teams:
+        pair = sorted(norm_team_name(t) for t in teams)
+        if len(pair) != 2:
+            raise ValueError("teams must be a pair of team names")
+        sql.append("AND m.team1 = ? AND m.team2 = ?"); params.extend(pair)
+    if event:
+        sql.append("AND instr(m.event, ?) > 0"); params.append(norm_event_name(event))
+    sql.append("ORDER BY m.member")
+    rows = []
+    for r in con.execute(" ".join(sql), params):
+        rec = dict(r)
+        rec["dates"] = json.loads(rec["dates"] or "[]")
+        rec["teams"] = {t for t in (rec["team1"], rec["team2"]) if t}
+        rows.append(rec)
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cricsheet match metadata index")
+    ap.add_argument("--db", type=str, default=DEFAULT_DB, help="SQLite index path")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    up = sub.add_parser("update", help="Index new/changed match files")
+    src = up.add_mutually_exclusive_group(required=True)
+    src.add_argument("--zip", type=str, help="Cricsheet T20I zip")
+    src.add_argument("--jsondir", type=str, help="Folder of extracted match JSONs")
+    q = sub.add_parser("query", help="List indexed matches")
+    q.add_argument("--date", type=str, default=None, help="Any of the match dates (YYYY-MM-DD)")
+    q.add_argument("--teams", nargs=2, default=None, metavar=("TEAM_A", "TEAM_B"))
+    q.add_argument("--event", type=str, default=None, help="Substring of the event name")
+    q.add_argument("--source", type=str, default=None, help="Only matches from this zip/folder")
+    args = ap.parse_args(argv)
+
+    con = connect(args.db)
+    if args.cmd == "update":
+        changed, removed = update(con, args.zip, args.jsondir)
+        print("[OK] Indexed:", args.db, "(new/changed:", changed, "removed:", removed, ")")
+        return
+    source = os.path.abspath(args.source) if args.source else None
+    for r in query(con, source=source, date=args.date, teams=args.teams, event=args.event):
+        print("\t".join([r["match_id"], r["first_date"] or "", " vs ".join(sorted(r["teams"])),
+                         r["event"] or "", r["venue"] or "", r["member"]]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Run instrumentation for the stage commands: wall and CPU time, rows, bytes read/written
+and peak RSS per stage and per sub-step, written to a machine-readable run report.
+
+Library code marks its sub-steps with `step(name)`:
+
+    with step("json_parse") as s:
+        match = load_json(raw)
+        s.bytes_read += len(raw)
+
+`step` is a no-op outside a run. Each stage's `main` runs inside `stage_run(stage, args)`,
+which collects the steps and on exit writes `run_report.json` next to the manifest (or to
+--report), keeping the latest run of every stage:
+
+  {"stages": {stage: {"started", "argv", "wall_s", "cpu_s", "peak_rss_mb",
+                      "peak_rss_children_mb", "bytes_read", "bytes_written", "ok",
+                      "steps": {name: {"calls", "wall_s", "cpu_s", "rows",
+                                       "bytes_read", "bytes_written", "peak_rss_mb"}}}}}
+
+Steps run in worker processes are timed there and merged back (`capture` / `merge`); CPU
+time of finished workers is included in the stage's cpu_s. peak_rss_mb of a step is the
+process high-water mark when the step last finished, so the step that raised it shows.
+
+--profile cprofile dumps a cProfile of the stage (parent process) to
+<report dir>/profiles/<stage>.prof and prints the top functions; --profile sample records
+the main thread's stack every few milliseconds into <stage>.folded (collapsed stacks, one
+"frame;frame;frame count" per line, for flame graph tools).
+Only the standard library is imported.
+"""
+import os, sys, json, time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+REPORT_NAME = "run_report.json"
+_CURRENT = None
+
+def _maxrss_mb(who="self"):
+    if resource is None:
+        return None
+    ru = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # kilobytes on Linux, bytes on macOS
+    return ru.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+class StepStats:
+    __slots__ = ("calls", "wall_s", "cpu_s", "rows", "bytes_read", "bytes_written", "peak_rss_mb")
+
+    def __init__(self):
+        self.calls, self.wall_s, self.cpu_s = 0, 0.0, 0.0
+        self.rows, self.bytes_read, self.bytes_written = 0, 0, 0
+        self.peak_rss_mb = None
+
+    def add(self, d):
+        self.calls += d["calls"]; self.wall_s += d["wall_s"]; self.cpu_s += d["cpu_s"]
+        self.rows += d["rows"]; self.bytes_read += d["bytes_read"]; self.bytes_written += d["bytes_written"]
+        if d.get("peak_rss_mb") is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, d["peak_rss_mb"])
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+class Recorder:
+    """Sub-step totals for one process."""
+
+    def __init__(self):
+        self.steps = {}
+
+    @contextmanager
+    def step(self, name):
+        s = self.steps.get(name)
+        if s is None:
+            s = self.steps[name] = StepStats()
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield s
+        finally:
+            s.calls += 1
+            s.wall_s += time.perf_counter() - w0
+            s.cpu_s += time.process_time() - c0
+            s.peak_rss_mb = _maxrss_mb()
+
+    def merge(self, steps):
+        for name, d in steps.items():
+            self.steps.setdefault(name, StepStats()).add(d)
+
+    def as_dict(self):
+        return {name: s.as_dict() for name, s in self.steps.items()}
+
+def active():
+    return _CURRENT is not None
+
+@contextmanager
+def step(name):
+    """Time a sub-step of the current run; yields stats whose rows/bytes the caller adds to."""
+    if _CURRENT is None:
+        yield StepStats()
+        return
+    with _CURRENT.step(name) as s:
+        yield s
+
+@contextmanager
+def capture():
+    """Collect steps in a worker process; the caller ships `rec.as_dict()` back for `merge`."""
+    global _CURRENT
+    prev, _CURRENT = _CURRENT, Recorder()
+    try:
+        yield _CURRENT
+    finally:
+        _CURRENT = prev
+
+def merge(steps):
+    if _CURRENT is not None and steps:
+        _CURRENT.merge(steps)
+
+def file_size(path):
+    """Bytes in a file, or in every file under a directory (0 when missing)."""
+    if os.path.isdir(path):
+        return sum(file_size(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def report_path(args):
+    return getattr(args, "report", None) or os.path.join(
+        os.path.dirname(os.path.abspath(getattr(args, "manifest", None) or "manifest.json")), REPORT_NAME)
+
+def add_arguments(ap):
+    ap.add_argument("--report", type=str, default=None, help=f"Run report (default: {REPORT_NAME} next to --manifest)")
+    ap.add_argument("--profile", choices=("cprofile", "sample"), default=None,
+                    help="Also profile the stage into <report dir>/profiles/")
+
+class _Sampler:
+    """Collapsed stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, interval=0.005):
+        import threading
+        self.interval, self.counts = interval, {}
+        self.target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in sorted(self.counts.items(), key=lambda kv: -kv[1]):
+                f.write(f"{stack} {n}\n")
+
+def _save_report(path, stage, entry):
+    # re-read so stages running one after another each keep their section
+    report = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except ValueError:
+            report = {}
+    report.setdefault("stages", {})[stage] = entry
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+
+@contextmanager
+def stage_run(stage, args, argv=None):
+    """Instrument one stage command and write its section of the run report."""
+    global _CURRENT
+    path = report_path(args)
+    profile = getattr(args, "profile", None)
+    prof_dir = os.path.join(os.path.dirname(path), "profiles")
+    prev, _CURRENT = _CURRENT, Recorder()
+    started = time.strftime("%Y-%m-%dT%H:%M:%S")
+    w0, c0, cc0 = time.perf_counter(), time.process_time(), _children_cpu()
+    profiler = sampler = None
+    if profile == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif profile == "sample":
+        sampler = _Sampler().__enter__()
+    ok = False
+    try:
+        yield _CURRENT
+        ok = True
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.__exit__(None, None, None)
+        steps = _CURRENT.as_dict()
+        _CURRENT = prev
+        entry = {
+            "started": started,
+            "argv": list(sys.argv[1:] if argv is None else argv),
+            "ok": ok,
+            "wall_s": time.perf_counter() - w0,
+            "cpu_s": time.process_time() - c0 + _children_cpu() - cc0,
+            "peak_rss_mb": _maxrss_mb(),
+            "peak_rss_children_mb": _maxrss_mb("children"),
+            "bytes_read": sum(s["bytes_read"] for s in steps.values()),
+            "bytes_written": sum(s["bytes_written"] for s in steps.values()),
+            "steps": steps,
+        }
+        if profile:
+            os.makedirs(prof_dir, exist_ok=True)
+        if profiler is not None:
+            import pstats
+            out = os.path.join(prof_dir, f"{stage}.prof")
+            profiler.dump_stats(out)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+            entry["profile"] = out
+        if sampler is not None:
+            out = os.path.join(prof_dir, f"{stage}.folded")
+            sampler.dump(out)
+            entry["profile"] = out
+        _save_report(path, stage, entry)
+        print(f"[OK] Run report: {path} ({stage}: {entry['wall_s']:.2f}s wall, {entry['cpu_s']:.2f}s CPU, "
+              f"peak RSS {entry['peak_rss_mb'] or 0:.0f} MB)")
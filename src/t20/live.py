@@ -0,0 +1,193 @@
+"""
+Live ball-by-ball WP engine.
+
+`MatchState.update` takes one delivery (the row dicts produced by
+`rows_from_v2_innings` / `rows_from_legacy_innings`), updates the running innings
+state in O(1) and returns the delivery with the same feature columns as
+`add_match_state_features` plus `wp_pred`. `LiveEngine` consumes an asyncio queue of
+deliveries from any number of concurrent matches; `replay` streams a Cricsheet match
+into that queue at a configurable speed so throughput and latency can be measured
+offline. numpy/pandas are only loaded once the first delivery is scored.
+
+Usage:
+  t20-live --zip data/raw/t20s_json.zip --matches 1298150 951373 --speed 60
+  t20-live --jsondir data/t20s_json --matches 1298150 --speed 0 --quiet   # as fast as possible
+"""
+import os, time, argparse
+from collections import deque
+
+from t20.cricsheet import load_json, flatten_match_to_rows
+
+NAN = float("nan")
+
+class MatchState:
+    """Running state of one match; `update` is O(1) per delivery."""
+    __slots__ = ("match_id", "model", "innings", "runs", "wkts", "legal", "innings_totals")
+
+    def __init__(self, match_id, model=None):
+        self.match_id = match_id
+        self.model = model
+        self.innings = None
+        self.runs = self.wkts = self.legal = 0
+        self.innings_totals = {}
+
+    def update(self, delivery):
+        from t20.features import phase_from_over
+        innings = int(delivery["innings"])
+        if innings != self.innings:
+            if self.innings is not None:
+                self.innings_totals[self.innings] = self.runs
+            self.innings, self.runs, self.wkts, self.legal = innings, 0, 0, 0
+        over = int(delivery.get("over") or 0)
+        extras_type = delivery.get("extras_type") or ""
+        legal_ball = extras_type.lower() != "wides"
+        wicket_event = bool(delivery.get("wicket_event"))
+        self.runs += int(delivery.get("runs_total") or 0)
+        self.wkts += wicket_event
+        self.legal += legal_ball
+        balls_remaining = 120 - self.legal
+
+        out = dict(delivery)
+        out.update({
+            "phase": phase_from_over(over),
+            "extras_type": extras_type,
+            "legal_ball": legal_ball,
+            "wicket_event": wicket_event,
+            "innings_runs": self.runs,
+            "innings_wkts": self.wkts,
+            "balls_bowled_legal": self.legal,
+            "balls_remaining": balls_remaining,
+            "target_runs": NAN,
+            "runs_remaining": NAN,
+            "CRR": self.runs * 6.0 / self.legal if self.legal else NAN,
+            "RRR": NAN,
+        })
+        if innings == 2:
+            target = self.innings_totals.get(1, 0) + 1
+            runs_remaining = max(target - self.runs, 0)
+            out["target_runs"] = float(target)
+            out["runs_remaining"] = float(runs_remaining)
+            out["RRR"] = runs_remaining * 6.0 / balls_remaining if balls_remaining else NAN
+        out["wp_pred"] = score(out, self.model)
+        return out
+
+def score(features, model=None):
+    """WP for one delivery: table lookup when available, otherwise the model's batch path."""
+    from t20.wp import predict_wp_placeholder
+    if model is None:
+        return predict_wp_placeholder(features)
+    if features["innings"] != 2:
+        return NAN
+    if hasattr(model, "lookup"):
+        wp = model.lookup(features["runs_remaining"], features["balls_remaining"], features["innings_wkts"])
+        if wp is not None:
+            return wp
+        model = getattr(model, "fallback", None)
+        if model is None:
+            return predict_wp_placeholder(features)
+    return float(model.predict({k: [v] for k, v in features.items()})[0])
+
+class LiveEngine:
+    """Scores deliveries from many concurrent matches arriving on one asyncio queue."""
+
+    def __init__(self, model=None, on_update=None, window=100_000):
+        import t20.features, t20.wp  # load the scoring modules before the first delivery arrives
+        self.model = model
+        self.on_update = on_update
+        self.matches = {}
+        self.latencies = deque(maxlen=window)
+        self.n_deliveries = 0
+
+    def process(self, match_id, delivery):
+        state = self.matches.get(match_id)
+        if state is None:
+            state = self.matches[match_id] = MatchState(match_id, self.model)
+        return state.update(delivery)
+
+    async def consume(self, queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            match_id, delivery, t_sent = item
+            out = self.process(match_id, delivery)
+            self.latencies.append(time.perf_counter() - t_sent)
+            self.n_deliveries += 1
+            if self.on_update is not None:
+                self.on_update(match_id, out)
+
+    def stats(self, elapsed):
+        lat = sorted(self.latencies)
+        pct = lambda q: 1000 * lat[min(len(lat) - 1, int(q * len(lat)))] if lat else NAN
+        return {
+            "matches": len(self.matches),
+            "deliveries": self.n_deliveries,
+            "elapsed_s": elapsed,
+            "deliveries_per_s": self.n_deliveries / elapsed if elapsed else NAN,
+            "latency_p50_ms": pct(0.50),
+            "latency_p99_ms": pct(0.99),
+            "latency_max_ms": 1000 * lat[-1] if lat else NAN,
+        }
+
+def load_match_rows(name, zip_path=None):
+    if zip_path:
+        import zipfile
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            raw = zf.read(name)
+    else:
+        with open(name, "rb") as f:
+            raw = f.read()
+    return flatten_match_to_rows(load_json(raw))[1]
+
+async def replay(queue, match_id, rows, speed=1.0, interval=40.0):
+    """Feed `rows` one delivery at a time; `interval` seconds per ball at speed 1, speed 0 = no delay."""
+    import asyncio
+    delay = interval / speed if speed > 0 else 0.0
+    for row in rows:
+        await queue.put((match_id, row, time.perf_counter()))
+        await asyncio.sleep(delay)
+
+async def run_replay(matches, model=None, speed=1.0, interval=40.0, on_update=None):
+    """Replay {match_id: rows} concurrently through one LiveEngine; returns its stats."""
+    import asyncio
+    queue = asyncio.Queue(maxsize=10_000)
+    engine = LiveEngine(model, on_update)
+    t0 = time.perf_counter()
+    consumer = asyncio.create_task(engine.consume(queue))
+    await asyncio.gather(*(replay(queue, m, rows, speed, interval) for m, rows in matches.items()))
+    await queue.put(None)
+    await consumer
+    return engine.stats(time.perf_counter() - t0)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay Cricsheet matches through the live WP engine")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--zip", type=str, help="Cricsheet T20I zip")
+    src.add_argument("--jsondir", type=str, help="Folder of match JSONs")
+    ap.add_argument("--matches", nargs="+", required=True, help="Match ids (file stems) to replay concurrently")
+    ap.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (0 = as fast as possible)")
+    ap.add_argument("--interval", type=float, default=40.0, help="Seconds between deliveries at speed 1")
+    ap.add_argument("--model", type=str, default=None, help="WP state table from t20-train-wp")
+    ap.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = ap.parse_args(argv)
+
+    model = None
+    if args.model:
+        from t20.wp_table import TableWP
+        model = TableWP(args.model)
+    matches = {}
+    for m in args.matches:
+        name = f"{m}.json" if args.zip else os.path.join(args.jsondir, f"{m}.json")
+        matches[m] = load_match_rows(name, args.zip)
+
+    def show(match_id, out):
+        wp = out["wp_pred"]
+        print(f"{match_id} inn {out['innings']} {out['over']}.{out['ball_in_over']} "
+              f"{out['innings_runs']}/{out['innings_wkts']} WP {'-' if wp != wp else f'{wp:.3f}'}")
+
+    import asyncio
+    stats = asyncio.run(run_replay(matches, model, args.speed, args.interval, None if args.quiet else show))
+    print("[OK] Replayed:", ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}" for k, v in stats.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Streaming, mergeable WP scoring metrics.
+
+`WPMetrics.update(pred, outcome)` folds a batch of predictions into fixed-size sums:
+per-bin counts / prediction sums / outcome sums for the reliability curve, the Brier
+and log-loss sums, and per-class histograms of the predictions for AUC (exact up to
+ties within one of `auc_bins` equal-width bins). Nothing per-prediction is kept, so
+memory does not grow with the corpus; accumulators built on different chunks, files
+or workers combine with `merge` (or `+=`) and round-trip through `to_dict`/`from_dict`
+for the stage cache and JSON reports.
+"""
+import numpy as np
+import pandas as pd
+
+EPS = 1e-15
+
+def bin_index(p, n_bins):
+    """Equal-width bin of each prediction in [0, 1]; out-of-range values go to the end bins."""
+    edges = np.linspace(0, 1, n_bins + 1)
+    return np.clip(np.digitize(p, edges, right=False) - 1, 0, n_bins - 1)
+
+class WPMetrics:
+    """Reliability bins, Brier score, log loss and AUC accumulated over prediction batches."""
+
+    def __init__(self, n_bins=10, auc_bins=10_000):
+        self.n_bins = n_bins
+        self.auc_bins = auc_bins
+        self.count = np.zeros(n_bins, dtype=np.int64)
+        self.sum_pred = np.zeros(n_bins)
+        self.sum_obs = np.zeros(n_bins)
+        self.pos = np.zeros(auc_bins, dtype=np.int64)
+        self.neg = np.zeros(auc_bins, dtype=np.int64)
+        self.brier_sum = 0.0
+        self.log_loss_sum = 0.0
+
+    @property
+    def n(self):
+        return int(self.count.sum())
+
+    def update(self, pred, outcome):
+        p = np.asarray(pred, dtype=float)
+        y = np.asarray(outcome, dtype=float)
+        ok = ~(np.isnan(p) | np.isnan(y))
+        p, y = p[ok], y[ok]
+        if not len(p):
+            return self
+        idx = bin_index(p, self.n_bins)
+        self.count += np.bincount(idx, minlength=self.n_bins)
+        self.sum_pred += np.bincount(idx, weights=p, minlength=self.n_bins)
+        self.sum_obs += np.bincount(idx, weights=y, minlength=self.n_bins)
+        self.brier_sum += float(np.square(p - y).sum())
+        pc = np.clip(p, EPS, 1 - EPS)
+        self.log_loss_sum += float(-(y * np.log(pc) + (1 - y) * np.log1p(-pc)).sum())
+        fine = bin_index(p, self.auc_bins)
+        won = y > 0.5
+        self.pos += np.bincount(fine[won], minlength=self.auc_bins)
+        self.neg += np.bincount(fine[~won], minlength=self.auc_bins)
+        return self
+
+    def merge(self, other):
+        if (self.n_bins, self.auc_bins) != (other.n_bins, other.auc_bins):
+            raise ValueError("can only merge WPMetrics with the same n_bins/auc_bins")
+        self.count += other.count
+        self.sum_pred += other.sum_pred
+        self.sum_obs += other.sum_obs
+        self.pos += other.pos
+        self.neg += other.neg
+        self.brier_sum += other.brier_sum
+        self.log_loss_sum += other.log_loss_sum
+        return self
+
+    __iadd__ = merge
+
+    @classmethod
+    def combine(cls, parts, n_bins=10, auc_bins=10_000):
+        total = cls(n_bins, auc_bins)
+        for part in parts:
+            total.merge(part)
+        return total
+
+    # ---- results ----
+
+    def reliability(self):
+        """bin_mid, pred_mean, obs_rate, count per bin (NaN means for empty bins)."""
+        edges = np.linspace(0, 1, self.n_bins + 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "bin_mid": (edges[:-1] + edges[1:]) / 2,
+                "pred_mean": np.where(self.count > 0, self.sum_pred / self.count, np.nan),
+                "obs_rate": np.where(self.count > 0, self.sum_obs / self.count, np.nan),
+                "count": self.count.astype(int),
+            })
+
+    def brier(self):
+        return self.brier_sum / self.n if self.n else np.nan
+
+    def log_loss(self):
+        return self.log_loss_sum / self.n if self.n else np.nan
+
+    def auc(self):
+        """P(pred for a won chase > pred for a lost one), ties within a fine bin counted as 1/2."""
+        n_pos, n_neg = int(self.pos.sum()), int(self.neg.sum())
+        if not n_pos or not n_neg:
+            return np.nan
+        neg_below = np.cumsum(self.neg) - self.neg
+        return float((self.pos * (neg_below + 0.5 * self.neg)).sum() / (n_pos * n_neg))
+
+    def ece(self):
+        """Expected calibration error: count-weighted |pred_mean - obs_rate| over the bins."""
+        if not self.n:
+            return np.nan
+        return float(np.abs(self.sum_pred - self.sum_obs).sum() / self.n)
+
+    def summary(self):
+        return {
+            "n": self.n,
+            "base_rate": float(self.sum_obs.sum() / self.n) if self.n else np.nan,
+            "brier": self.brier(),
+            "log_loss": self.log_loss(),
+            "auc": self.auc(),
+            "ece": self.ece(),
+        }
+
+    # ---- serialisation (cache entries, JSON reports) ----
+
+    def to_dict(self):
+        nz_pos, nz_neg = np.flatnonzero(self.pos), np.flatnonzero(self.neg)
+        return {
+            "n_bins": self.n_bins, "auc_bins": self.auc_bins,
+            "count": self.count.tolist(), "sum_pred": self.sum_pred.tolist(), "sum_obs": self.sum_obs.tolist(),
+            "brier_sum": self.brier_sum, "log_loss_sum": self.log_loss_sum,
+            # the AUC histograms are sparse: store {bin: count}
+            "pos": dict(zip(nz_pos.tolist(), self.pos[nz_pos].tolist())),
+            "neg": dict(zip(nz_neg.tolist(), self.neg[nz_neg].tolist())),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        m = cls(d["n_bins"], d["auc_bins"])
+        m.count[:] = d["count"]; m.sum_pred[:] = d["sum_pred"]; m.sum_obs[:] = d["sum_obs"]
+        m.brier_sum, m.log_loss_sum = d["brier_sum"], d["log_loss_sum"]
+        for name in ("pos", "neg"):
+            hist = getattr(m, name)
+            for k, v in d[name].items():
+                hist[int(k)] = v
+        return m
+
+def _json_safe(v):
+    return None if isinstance(v, float) and np.isnan(v) else v
+
+def save_metrics(path, metrics, **extra):
+    """JSON with the summary, the reliability table and the mergeable state (`load_metrics`)."""
+    import json, os
+    rel = metrics.reliability()
+    doc = dict(extra)
+    doc["summary"] = {k: _json_safe(v) for k, v in metrics.summary().items()}
+    doc["reliability"] = [{k: _json_safe(float(v)) if k != "count" else int(v) for k, v in row.items()}
+                          for row in rel.to_dict("records")]
+    doc["state"] = metrics.to_dict()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1)
+    os.replace(path + ".part", path)
+
+def load_metrics(path):
+    import json
+    with open(path, encoding="utf-8") as f:
+        return WPMetrics.from_dict(json.load(f)["state"])
@@ -0,0 +1,179 @@
+"""
+In-process pipeline runner (`t20-run`).
+
+The stages run as a small dependency graph in one process: each node is a function of
+its dependencies' results, so the extracted rows, feature frames and enriched frames
+are handed on in memory instead of being written to CSV and parsed again by the next
+script. Nodes whose dependencies are done run concurrently on a thread pool (the two
+target matches go through features/WP side by side; CSV sinks write while the next
+stage computes). On-disk CSVs are optional sinks; figures are drawn at the end on a
+process pool.
+
+Usage:
+  t20-run --zip data/raw/t20s_json.zip --figures outputs/figures
+  t20-run --zip data/raw/t20s_json.zip --processed data/processed --tables outputs/tables --workers 4
+"""
+import os, time, argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+class Pipeline:
+    """Dependency graph of named nodes; `run` executes ready nodes concurrently."""
+
+    def __init__(self):
+        self.nodes = {}
+
+    def add(self, name, func, *deps):
+        if name in self.nodes:
+            raise ValueError(f"duplicate node: {name}")
+        missing = [d for d in deps if d not in self.nodes]
+        if missing:
+            raise ValueError(f"{name}: unknown dependencies {missing}")
+        self.nodes[name] = (func, deps)
+        return name
+
+    def run(self, threads=4):
+        """Run every node; returns ({name: result}, {name: seconds})."""
+        results, timings = {}, {}
+        waiting = dict(self.nodes)
+
+        def call(name, func, deps):
+            t0 = time.perf_counter()
+            out = func(*(results[d] for d in deps))
+            timings[name] = time.perf_counter() - t0
+            return out
+
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            running = {}
+            while waiting or running:
+                for name, (func, deps) in list(waiting.items()):
+                    if all(d in results for d in deps):
+                        running[ex.submit(call, name, func, deps)] = name
+                        del waiting[name]
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    results[running.pop(fut)] = fut.result()
+        return results, timings
+
+# ---- t20 stages ----
+
+def _extract(names, zip_path, workers):
+    import pandas as pd
+    from t20.extract import find_targets
+    return {outfile: pd.DataFrame(rows) for outfile, rows in find_targets(names, zip_path, workers).items() if rows}
+
+def _features(df):
+    from t20.features import add_match_state_features
+    return None if df is None else add_match_state_features(df)
+
+def _simulator(path, n_paths, *feats):
+    """Chase simulator from saved outcome counts, or fitted on every target's features."""
+    from t20.simulate import ChaseSimulator, fit_outcomes, load_outcomes
+    counts = load_outcomes(path) if path else sum(fit_outcomes(f) for f in feats if f is not None)
+    return ChaseSimulator(counts, n_paths=n_paths)
+
+def _wp(feat, model, sim):
+    from t20.wp_pipeline import enrich
+    return None if feat is None else enrich(feat, model, sim=sim)
+
+def _sink(df, path, **csv_kw):
+    if df is not None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        df.to_csv(path, index=False, encoding="utf-8", **csv_kw)
+        print("[OK] Wrote:", path, "(rows:", len(df), ")")
+    return path
+
+def _figures(outdir, fig_workers, *enriched):
+    from t20.figures import wp_figure_data, wp_figure_jobs, chases, figure_xy_jobs, render_jobs
+    jobs = []
+    for base, out in enriched:
+        if out is None:
+            continue
+        df_opt, metrics = out
+        jobs += wp_figure_jobs(base, outdir, wp_figure_data(df_opt, metrics.reliability()))
+        for _, ch in chases(df_opt):
+            jobs += figure_xy_jobs(ch, outdir)
+    paths = render_jobs(jobs, fig_workers)
+    print("[OK] Drew", len(paths), "figures in", outdir)
+    return paths
+
+def _metrics(path, *enriched):
+    """Corpus-level WP metrics merged from every target's accumulator."""
+    from t20.metrics import WPMetrics, save_metrics
+    corpus = WPMetrics.combine(out[1] for out in enriched if out is not None)
+    print("[OK] Corpus metrics:", ", ".join(f"{k}={v:.4g}" for k, v in corpus.summary().items()))
+    if path:
+        save_metrics(path, corpus, files=sum(out is not None for out in enriched))
+    return corpus
+
+def build_pipeline(names, zip_path=None, workers=1, model=None, processed=None, tables=None,
+                   figures=None, fig_workers=None, targets=None, sim=None, sim_paths=1000):
+    from t20.extract import TARGETS
+    p = Pipeline()
+    p.add("extract", lambda: _extract(names, zip_path, workers))
+    feats = []
+    for T in targets or TARGETS:
+        outfile = T["outfile"]
+        stem = os.path.splitext(outfile)[0]
+        base = f"{stem}_features"
+        bbb = p.add(f"ball_by_ball:{stem}", lambda ex, o=outfile: ex.get(o), "extract")
+        feat = p.add(f"features:{stem}", _features, bbb)
+        if processed:
+            # csv-module line endings, as 01 writes them
+            p.add(f"sink:{outfile}", lambda df, path=os.path.join(processed, outfile): _sink(df, path, lineterminator="\r\n"), bbb)
+            p.add(f"sink:{base}.csv", lambda df, path=os.path.join(processed, f"{base}.csv"): _sink(df, path), feat)
+        feats.append((stem, base, feat))
+    # one simulator for every target; the WP nodes share its memo and surface (under its lock)
+    p.add("simulator", lambda *fs: _simulator(sim, sim_paths, *fs), *(f for _, _, f in feats))
+    enriched = []
+    for stem, base, feat in feats:
+        wp = p.add(f"wp:{stem}", lambda f, s: _wp(f, model, s), feat, "simulator")
+        if tables:
+            path = os.path.join(tables, f"{base}_wp_enriched.csv")
+            p.add(f"sink:{base}_wp_enriched.csv", lambda out, path=path: _sink(out and out[0], path), wp)
+        enriched.append((base, wp))
+    metrics_json = os.path.join(tables, "wp_metrics.json") if tables else None
+    p.add("metrics", lambda *outs: _metrics(metrics_json, *outs), *(w for _, w in enriched))
+    if figures:
+        bases = [b for b, _ in enriched]
+        p.add("figures", lambda *outs: _figures(figures, fig_workers, *zip(bases, outs)), *(w for _, w in enriched))
+    return p
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run extract -> features -> WP -> figures in one process")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--zip", type=str, help="Cricsheet T20I zip (read in place)")
+    src.add_argument("--jsondir", type=str, help="Folder of match JSONs")
+    ap.add_argument("--workers", type=int, default=1, help="Processes used to parse matches")
+    ap.add_argument("--threads", type=int, default=4, help="Independent stages run at once")
+    ap.add_argument("--model", type=str, default=None, help="WP state table from t20-train-wp (default: placeholder)")
+    ap.add_argument("--sim", type=str, default=None, help="Outcome counts from t20-fit-sim (default: fitted on the targets)")
+    ap.add_argument("--sim-paths", type=int, default=1000, help="Simulated paths per chase state for wp_opt/wp_delta")
+    ap.add_argument("--processed", type=str, default=None, help="Also write ball-by-ball and features CSVs here")
+    ap.add_argument("--tables", type=str, default=None, help="Also write enriched CSVs here")
+    ap.add_argument("--figures", type=str, default="outputs/figures", help="Where to draw the figures")
+    ap.add_argument("--no-plots", action="store_true", help="Skip the figures")
+    ap.add_argument("--fig-workers", type=int, default=None, help="Processes for drawing (default: all cores)")
+    args = ap.parse_args(argv)
+
+    from t20.extract import list_zip_members
+    if args.jsondir:
+        from pathlib import Path
+        names, zip_path = [str(p) for p in sorted(Path(args.jsondir).glob("*.json"))], None
+    else:
+        names, zip_path = list_zip_members(args.zip), args.zip
+    model = None
+    if args.model:
+        from t20.wp_table import TableWP
+        model = TableWP(args.model)
+
+    pipeline = build_pipeline(names, zip_path, args.workers, model, args.processed, args.tables,
+                              None if args.no_plots else args.figures, args.fig_workers,
+                              sim=args.sim, sim_paths=args.sim_paths)
+    t0 = time.perf_counter()
+    _, timings = pipeline.run(args.threads)
+    for name, secs in timings.items():
+        print(f"  {name:<60s} {secs:8.3f}s")
+    print(f"[OK] Pipeline finished in {time.perf_counter() - t0:.3f}s")
+
+if __name__ == "__main__":
+    main()
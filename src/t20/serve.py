@@ -0,0 +1,194 @@
+"""
+Local WP service (`t20-serve`): the WP scoring of the WP stage (t20.wp_pipeline) behind a
+small JSON-over-HTTP API, so dashboards and notebooks share one warm model.
+
+Usage:
+  t20-serve --port 8765 [--model models/wp_table.npy] [--sim models/sim_outcomes.json]
+  t20-serve --unix /tmp/t20-wp.sock
+Endpoints:
+  POST /wp        {"runs_remaining": 37, "balls_remaining": 30, "wickets": 4, "target": 160}
+                  -> {"wp": 0.41, "state": [...], "cached": false}; with --sim also wp_sim,
+                  wp_opt and opt_policy (t20.simulate)
+  POST /wp/batch  {"states": [{...}, ...]} -> {"results": [...]}
+  GET  /stats     requests, states, cache hit rate, errors, requests/s, latency percentiles
+  GET  /health
+A chase state is discretized to (target, runs_remaining, balls_remaining, wickets) integers
+(balls 0..120, wickets 0..10; target is optional and only feeds CRR) and that tuple keys an
+LRU cache of results (--cache-size). A batch scores all of its misses in one vectorized
+call. Each connection gets a thread (ThreadingHTTPServer, keep-alive); the cache is shared
+under a lock, and the simulator locks its own memo and surface. benchmarks/bench_serve.py
+load-tests a running or spawned instance.
+numpy and the HTTP server (t20._serve_http: handlers and server classes) are imported
+when the service starts, not for --help.
+"""
+import os, sys, math, time, argparse, threading
+from collections import OrderedDict, deque
+
+MAX_BALLS = 120
+MAX_WKTS = 10
+
+def discretize(state):
+    """(target, runs_remaining, balls_remaining, wickets) ints from a request dict; ValueError if
+    incomplete or not a finite number."""
+    def num(*names, default=None):
+        for n in names:
+            v = state.get(n)
+            if v is not None:
+                v = float(v)
+                if not math.isfinite(v):
+                    raise ValueError(f"{n} must be a finite number")
+                return int(round(v))
+        if default is None:
+            raise ValueError(f"missing {names[0]}")
+        return default
+    target = num("target", "target_runs", default=-1)
+    runs = max(num("runs_remaining"), 0)
+    balls = min(max(num("balls_remaining"), 0), MAX_BALLS)
+    wkts = min(max(num("wickets", "innings_wkts"), 0), MAX_WKTS)
+    return (target if target >= 0 else None, runs, balls, wkts)
+
+def state_frame(keys):
+    """Feature columns (as the WP stage computes them) for discretized chase states."""
+    import numpy as np
+    target = np.array([np.nan if k[0] is None else k[0] for k in keys], dtype=float)
+    runs, balls, wkts = (np.array([k[i] for k in keys], dtype=float) for i in (1, 2, 3))
+    bowled = MAX_BALLS - balls
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crr = np.where(bowled > 0, (target - runs) * 6.0 / bowled, np.nan)
+        rrr = np.where(balls > 0, runs * 6.0 / balls, np.nan)
+    return {"innings": np.full(len(keys), 2.0), "over": np.maximum(bowled - 1, 0) // 6, "CRR": crr, "RRR": rrr,
+            "innings_wkts": wkts, "balls_remaining": balls, "runs_remaining": runs, "target_runs": target}
+
+class WPScorer:
+    """WP (and simulated policy WP with `sim`) for discretized states, behind an LRU cache."""
+
+    def __init__(self, model=None, sim=None, cache_size=100_000):
+        self.model, self.sim = model, sim
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = self.misses = 0
+        self._cache_lock = threading.Lock()
+
+    def _compute(self, keys):
+        from t20.wp import predict_wp_batch
+        frame = state_frame(keys)
+        wp = predict_wp_batch(frame, self.model)
+        out = [{"wp": None if v != v else float(v)} for v in wp]
+        if self.sim is not None:
+            import numpy as np
+            probs = self.sim.win_probs(frame["runs_remaining"].astype(np.int64), frame["balls_remaining"].astype(np.int64),
+                                       frame["innings_wkts"].astype(np.int64))
+            names = list(self.sim.policies)
+            for res, p in zip(out, probs):
+                best = int(np.argmax(p))
+                res.update(wp_sim=float(p[0]), wp_opt=float(p[best]), opt_policy=names[best])
+        return out
+
+    def score(self, keys):
+        """One result dict per key, in order; misses are computed together."""
+        results, missing = [None] * len(keys), {}
+        with self._cache_lock:
+            for i, k in enumerate(keys):
+                hit = self.cache.get(k)
+                if hit is None:
+                    missing.setdefault(k, []).append(i)
+                else:
+                    self.cache.move_to_end(k)
+                    results[i] = dict(hit, cached=True)
+            self.hits += len(keys) - sum(map(len, missing.values()))
+            self.misses += sum(map(len, missing.values()))
+        if missing:
+            new = list(missing)
+            computed = self._compute(new)
+            with self._cache_lock:
+                for k, res in zip(new, computed):
+                    self.cache[k] = res
+                    self.cache.move_to_end(k)
+                    for i in missing[k]:
+                        results[i] = dict(res, cached=False)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        for k, res in zip(keys, results):
+            res["state"] = list(k)
+        return results
+
+class Counters:
+    """Request/state/error counts and a window of request latencies."""
+
+    def __init__(self, window=100_000):
+        self.started = time.perf_counter()
+        self.requests, self.states, self.errors = {}, 0, 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, path, n_states, seconds, ok=True):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            self.states += n_states
+            self.errors += not ok
+            self.latencies.append(seconds)
+
+    def snapshot(self, scorer):
+        with self._lock:
+            lat = sorted(self.latencies)
+            requests, states, errors = dict(self.requests), self.states, self.errors
+        elapsed = time.perf_counter() - self.started
+        pct = lambda q: 1000 * lat[min(len(lat) - 1, int(q * len(lat)))] if lat else None
+        total = sum(requests.values())
+        looked_up = scorer.hits + scorer.misses
+        return {
+            "uptime_s": elapsed,
+            "requests": requests,
+            "states": states,
+            "errors": errors,
+            "requests_per_s": total / elapsed if elapsed else None,
+            "states_per_s": states / elapsed if elapsed else None,
+            "cache_size": len(scorer.cache),
+            "cache_hit_rate": scorer.hits / looked_up if looked_up else None,
+            "latency_p50_ms": pct(0.50),
+            "latency_p99_ms": pct(0.99),
+            "latency_max_ms": 1000 * lat[-1] if lat else None,
+        }
+
+def make_server(scorer, host="127.0.0.1", port=8765, unix=None, verbose=False):
+    """Threaded HTTP server (TCP, or a Unix socket with `unix`) answering from `scorer`."""
+    from t20._serve_http import make_server
+    return make_server(scorer, host, port, unix, verbose)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve WP for chase states over local HTTP")
+    ap.add_argument("--host", type=str, default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--unix", type=str, default=None, help="Listen on this Unix socket instead of TCP")
+    ap.add_argument("--model", type=str, default=None, help="WP state table from t20-train-wp (default: placeholder)")
+    ap.add_argument("--sim", type=str, default=None, help="Outcome counts from t20-fit-sim: also return wp_opt/opt_policy")
+    ap.add_argument("--sim-paths", type=int, default=1000, help="Simulated paths per chase state")
+    ap.add_argument("--cache-size", type=int, default=100_000, help="States kept in the LRU cache")
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args(argv)
+
+    model = sim = None
+    if args.model:
+        from t20.wp_table import TableWP
+        model = TableWP(args.model)
+    if args.sim:
+        from t20.simulate import load_simulator
+        sim = load_simulator(args.sim, n_paths=args.sim_paths)
+    scorer = WPScorer(model, sim, args.cache_size)
+    scorer._compute([(None, 1, 1, 0)])  # import and warm the scoring path before the first request
+    server = make_server(scorer, args.host, args.port, args.unix, args.verbose)
+    where = args.unix or "http://%s:%d" % server.server_address[:2]
+    print("[OK] Serving WP on", where, flush=True)
+    import signal
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # clean up the socket on kill too
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Monte Carlo chase simulator for counterfactual WP.
+
+The rest of a chase is played out ball by ball from per-phase outcome distributions
+(wicket, 0-6 runs off a legal ball, wide) counted from the corpus. A wide is followed by
+the outcome of the legal delivery from a second draw, so each step uses one legal ball.
+
+Draws are pre-drawn per (balls_remaining, path) and shared by every state (common random
+numbers): a state's WP is a function of the state alone, so it does not depend on which
+batch or file it was scored in, the WP surface is smooth across neighbouring states, and
+policies are compared on identical paths, which keeps ΔWP low-variance. `n_paths` trades
+accuracy (standard error about 0.5/sqrt(n_paths)) for latency.
+
+Two engines give the same numbers. A few states are simulated forward, all their paths
+advancing together as NumPy arrays with decided paths dropped after every ball, and
+memoized per (runs_remaining, balls_remaining, innings_wkts). A large batch instead sweeps
+every state up to its largest runs/balls backwards from 0 balls left, one gather per ball
+level, and keeps the dense surface for later lookups.
+
+Policies tilt the corpus distributions for the rest of the innings: "attack" shifts mass
+to boundaries at the cost of more wickets, "defend" the other way. `optimized_wp` scores
+each chase state under every policy: wp_sim is the corpus-tempo WP, wp_opt the best
+policy's, wp_delta = wp_opt - wp_pred (the gain over the WP model, as the figures draw it)
+and wp_delta_sim = wp_opt - wp_sim (both from the same paths, so model error in wp_pred
+does not leak into it).
+
+Usage:
+  t20-fit-sim --indir data/processed --out models/sim_outcomes.json
+  t20-wp --indir data/processed --outdir outputs/tables --sim models/sim_outcomes.json --sim-paths 2000
+numpy/pandas are imported inside the functions that use them.
+"""
+import os, json, argparse, threading
+
+PHASES = ("powerplay", "middle", "death")
+# outcome k: runs added, wicket?, legal ball?
+OUTCOMES = ("wicket", "0", "1", "2", "3", "4", "5", "6", "wide")
+OUTCOME_RUNS = (0, 0, 1, 2, 3, 4, 5, 6, 1)
+OUTCOME_WICKET = (1, 0, 0, 0, 0, 0, 0, 0, 0)
+OUTCOME_LEGAL = (1, 1, 1, 1, 1, 1, 1, 1, 0)
+# (run tilt, wicket multiplier): run outcome k is reweighted by exp(tilt * runs_k / 6)
+POLICIES = {"steady": (0.0, 1.0), "attack": (0.4, 1.4), "defend": (-0.4, 0.75)}
+PRIOR = 0.5
+MAX_BALLS = 120
+MAX_WKTS = 10
+# more than 120 balls can score (a wide and a six per legal ball): never chased, and fits int16
+MAX_RUNS = 7 * MAX_BALLS + 1
+
+def phase_index(balls_remaining):
+    """0/1/2 = powerplay/middle/death for the next ball: t20.features.phase_codes of the `over`
+    value it carries in the data, the same buckets fit_outcomes counts."""
+    import numpy as np
+    from t20.features import phase_codes
+    return phase_codes((MAX_BALLS - np.asarray(balls_remaining)) // 6)
+
+def fit_outcomes(df):
+    """(3, len(OUTCOMES)) outcome counts per phase from ball-by-ball or feature rows; counts add across chunks."""
+    import numpy as np
+    from t20.features import phase_codes
+    phase = phase_codes(np.asarray(df["over"], dtype=int))
+    if "legal_ball" in df.columns:
+        legal = np.asarray(df["legal_ball"], dtype=bool)
+    else:
+        legal = ~df["extras_type"].fillna("").astype(str).str.lower().eq("wides").to_numpy()
+    wicket = np.asarray(df["wicket_event"], dtype=bool)
+    runs = np.clip(np.asarray(df["runs_total"], dtype=int), 0, 6)
+    outcome = np.where(~legal, len(OUTCOMES) - 1, np.where(wicket, 0, runs + 1))
+    counts = np.zeros((len(PHASES), len(OUTCOMES)), dtype=np.int64)
+    np.add.at(counts, (phase, outcome), 1)
+    return counts
+
+def fit_outcomes_files(paths, chunksize=None):
+    import numpy as np
+    from t20.features import read_csv_chunks
+    cols = ("over", "runs_total", "wicket_event", "legal_ball", "extras_type")
+    counts = np.zeros((len(PHASES), len(OUTCOMES)), dtype=np.int64)
+    for path in paths:
+        for chunk in read_csv_chunks(path, chunksize or 1_000_000, usecols=lambda c: c in cols):
+            counts += fit_outcomes(chunk)
+    return counts
+
+def save_outcomes(path, counts, **meta):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(meta, phases=list(PHASES), outcomes=list(OUTCOMES), counts=counts.tolist()), f, indent=2)
+
+def load_outcomes(path):
+    import numpy as np
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("outcomes") != list(OUTCOMES):
+        raise ValueError(f"{path}: outcome layout {doc.get('outcomes')} != {list(OUTCOMES)}")
+    return np.asarray(doc["counts"], dtype=np.int64)
+
+def policy_probs(counts, tilt=0.0, wicket_mult=1.0):
+    """(3, len(OUTCOMES)) probabilities: smoothed corpus rates, runs tilted and wickets scaled."""
+    import numpy as np
+    p = np.asarray(counts, dtype=float) + PRIOR
+    p /= p.sum(axis=1, keepdims=True)
+    runs = np.asarray(OUTCOME_RUNS, dtype=float)
+    legal_runs = np.asarray(OUTCOME_LEGAL, bool) & ~np.asarray(OUTCOME_WICKET, bool)
+    p[:, legal_runs] *= np.exp(tilt * runs[legal_runs] / 6)
+    p[:, 0] *= wicket_mult
+    return p / p.sum(axis=1, keepdims=True)
+
+class ChaseSimulator:
+    """Batched chase simulation with per-state memoization and a dense sweep for large batches."""
+
+    def __init__(self, counts, n_paths=1000, seed=0, policies=None, batch_cells=2_000_000):
+        import numpy as np
+        self.n_paths = n_paths
+        self.policies = dict(policies or POLICIES)
+        self.batch_cells = batch_cells
+        runs = np.asarray(OUTCOME_RUNS, dtype=np.int16)
+        wicket = np.asarray(OUTCOME_WICKET, dtype=np.int8)
+        wide = np.flatnonzero(~np.asarray(OUTCOME_LEGAL, bool))
+        # the draws for the ball bowled with b balls left on path p: a delivery, and the legal
+        # delivery that follows if the first one was a wide
+        rng = np.random.default_rng(seed)
+        first, second = rng.random((MAX_BALLS + 1, n_paths)), rng.random((MAX_BALLS + 1, n_paths))
+        phase = phase_index(np.arange(MAX_BALLS + 1))
+        self.d_runs = np.empty((len(self.policies), MAX_BALLS + 1, n_paths), dtype=np.int16)
+        self.d_wkts = np.empty((len(self.policies), MAX_BALLS + 1, n_paths), dtype=np.int8)
+        for k, (tilt, wicket_mult) in enumerate(self.policies.values()):
+            p = policy_probs(counts, tilt, wicket_mult)
+            legal = p.copy(); legal[:, wide] = 0
+            cum, cum_legal = np.cumsum(p, axis=1), np.cumsum(legal / legal.sum(axis=1, keepdims=True), axis=1)
+            cum[:, -1] = cum_legal[:, -1] = 1.0
+            for b in range(MAX_BALLS + 1):
+                o1 = np.searchsorted(cum[phase[b]], first[b], side="right")
+                o2 = np.searchsorted(cum_legal[phase[b]], second[b], side="right")
+                o = np.where(np.isin(o1, wide), o2, o1)
+                self.d_runs[k, b] = runs[o] + np.where(o == o1, 0, runs[o1])
+                self.d_wkts[k, b] = wicket[o]
+        self.memo = {}
+        self.surface = None
+        # memo fills and surface swaps are shared by every caller (WP threads, the service)
+        self._lock = threading.RLock()
+
+    def _simulate(self, k, runs, balls, wkts):
+        """Win fraction per state (1-D int arrays) under policy k, following each state's paths."""
+        import numpy as np
+        n, m = self.n_paths, len(runs)
+        d_runs, d_wkts = self.d_runs[k].ravel(), self.d_wkts[k].ravel()
+        # one entry per live (state, path) cell; decided cells are dropped after every ball
+        state = np.repeat(np.arange(m), n)
+        path = np.tile(np.arange(n), m)
+        runs = np.repeat(runs, n).astype(np.int16)
+        balls = np.repeat(balls, n).astype(np.int16)
+        wkts = np.repeat(wkts, n).astype(np.int8)
+        wins = np.bincount(state[runs <= 0], minlength=m)
+        while True:
+            live = (runs > 0) & (balls > 0) & (wkts < 10)
+            state, path, runs, balls, wkts = state[live], path[live], runs[live], balls[live], wkts[live]
+            if not len(state):
+                return wins / n
+            cell = balls.astype(np.intp) * n + path
+            runs -= d_runs[cell]
+            wkts += d_wkts[cell]
+            balls -= 1
+            wins += np.bincount(state[runs <= 0], minlength=m)
+
+    def _sweep(self, k, max_runs, max_balls):
+        """(max_runs+1, max_balls+1, 11) win fractions of every state under policy k, built up
+        from 0 balls left; each ball level needs one gather over (runs, wkts, paths)."""
+        import numpy as np
+        n = self.n_paths
+        r = np.arange(max_runs + 1)[:, None]
+        w = np.arange(MAX_WKTS + 1)[:, None]
+        p = np.arange(n)[None, None, :]
+        won = np.zeros((max_runs + 1, MAX_WKTS + 1, n), dtype=bool)
+        won[0] = True
+        out = np.empty((max_runs + 1, max_balls + 1, MAX_WKTS + 1))
+        out[:, 0] = won.mean(axis=2)
+        for b in range(1, max_balls + 1):
+            r_next = r - self.d_runs[k, b][None, :]
+            w_next = w + self.d_wkts[k, b][None, :]
+            nxt = won[np.maximum(r_next, 0)[:, None, :], np.minimum(w_next, MAX_WKTS)[None, :, :], p]
+            won = (r_next <= 0)[:, None, :] | ((w_next < MAX_WKTS)[None, :, :] & nxt)
+            won[:, MAX_WKTS] = False
+            won[0] = True
+            out[:, b] = won.mean(axis=2)
+        return out
+
+    def sweep(self, max_runs, max_balls=MAX_BALLS):
+        """Dense (n_policies, runs, balls, wkts) WP surface; kept for later lookups."""
+        import numpy as np
+        with self._lock:
+            self.surface = np.stack([self._sweep(k, max_runs, max_balls) for k in range(len(self.policies))])
+            return self.surface
+
+    def simulate(self, runs_remaining, balls_remaining, innings_wkts):
+        """(n_states, n_policies) WP for the given states, computed without the memo."""
+        import numpy as np
+        state = clip_states(runs_remaining, balls_remaining, innings_wkts)
+        out = np.empty((len(state), len(self.policies)))
+        # similar lengths together so a batch stops as soon as its longest chase is decided
+        order = np.argsort(state[:, 1], kind="stable")
+        step = max(1, self.batch_cells // self.n_paths)
+        for lo in range(0, len(order), step):
+            idx = order[lo:lo + step]
+            r, b, w = state[idx].T
+            for k in range(len(self.policies)):
+                out[idx, k] = self._simulate(k, r, b, w)
+        return out
+
+    def win_probs(self, runs_remaining, balls_remaining, innings_wkts):
+        """(n_states, n_policies) WP. States are looked up in the dense surface when it covers
+        them, else simulated once and memoized; a batch whose new states would cost more ball
+        steps than sweeping every state up to its largest runs/balls builds the surface instead.
+        Both give the same numbers: a state's paths depend only on the state. Thread-safe."""
+        import numpy as np
+        with self._lock:
+            state = clip_states(runs_remaining, balls_remaining, innings_wkts)
+            out = np.empty((len(state), len(self.policies)))
+            if self.surface is not None:
+                inside = (state[:, 0] < self.surface.shape[1]) & (state[:, 1] < self.surface.shape[2])
+            else:
+                inside = np.zeros(len(state), dtype=bool)
+            rest = state[~inside]
+            if len(rest):
+                keys = [tuple(s) for s in rest.tolist()]
+                new = list(dict.fromkeys(k for k in keys if k not in self.memo))
+                steps = sum(b for _, b, _ in new)
+                dense = (int(rest[:, 0].max()) + 1) * (int(rest[:, 1].max()) + 1) * (MAX_WKTS + 1)
+                if steps > dense:
+                    lo = self.surface.shape[1:3] if self.surface is not None else (0, 0)
+                    self.sweep(max(int(rest[:, 0].max()), lo[0] - 1), max(int(rest[:, 1].max()), lo[1] - 1))
+                    inside[:] = True
+                else:
+                    if new:
+                        for key, wp in zip(new, self.simulate(*np.asarray(new).T)):
+                            self.memo[key] = wp
+                    out[~inside] = [self.memo[key] for key in keys]
+            if inside.any():
+                r, b, w = state[inside].T
+                out[inside] = self.surface[:, r, b, w].T
+            return out
+
+def clip_states(runs_remaining, balls_remaining, innings_wkts):
+    """(n, 3) int states with runs in 0..MAX_RUNS, balls in 0..120 and wickets in 0..10 (no-balls
+    can push the feature stage's balls_remaining below zero; any larger target is out of reach)."""
+    import numpy as np
+    state = np.column_stack([np.asarray(v, dtype=np.int64) for v in (runs_remaining, balls_remaining, innings_wkts)])
+    state[:, 0] = np.clip(state[:, 0], 0, MAX_RUNS)
+    state[:, 1] = np.clip(state[:, 1], 0, MAX_BALLS)
+    state[:, 2] = np.clip(state[:, 2], 0, MAX_WKTS)
+    return state
+
+def optimized_wp(df_wp, sim):
+    """df_wp with wp_opt, wp_delta, wp_sim, wp_delta_sim and opt_policy from the simulator (NaN outside valid states)."""
+    import numpy as np
+    opt = df_wp.copy()
+    cols = ["runs_remaining", "balls_remaining", "innings_wkts"]
+    state = opt[cols].to_numpy(dtype=float)
+    ok = ~np.isnan(state).any(axis=1)
+    wp = np.full((len(opt), len(sim.policies)), np.nan)
+    if ok.any():
+        wp[ok] = sim.win_probs(*state[ok].astype(np.int64).T)
+    names = np.array(list(sim.policies))
+    best = np.nanargmax(np.where(ok[:, None], wp, 0.0), axis=1)
+    opt["wp_opt"] = wp[np.arange(len(opt)), best]
+    opt["wp_delta"] = opt["wp_opt"] - opt["wp_pred"]
+    opt["wp_sim"] = wp[:, 0]
+    opt["wp_delta_sim"] = opt["wp_opt"] - opt["wp_sim"]
+    opt["opt_policy"] = np.where(ok, names[best], None)
+    return opt
+
+def load_simulator(path=None, inputs=(), n_paths=1000, seed=0, chunksize=None):
+    """Simulator from saved counts (`t20-fit-sim`), or fitted on the given CSVs."""
+    counts = load_outcomes(path) if path else fit_outcomes_files(inputs, chunksize)
+    return ChaseSimulator(counts, n_paths=n_paths, seed=seed)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Count per-phase ball outcomes for the chase simulator")
+    ap.add_argument("--indir", type=str, required=True, help="Folder with *_features.csv or ball-by-ball CSVs")
+    ap.add_argument("--out", type=str, default="models/sim_outcomes.json", help="Where to write the counts")
+    ap.add_argument("--chunksize", type=int, default=None, help="Read CSVs this many rows at a time")
+    args = ap.parse_args(argv)
+    files = sorted(os.path.join(args.indir, f) for f in os.listdir(args.indir) if f.endswith("_features.csv"))
+    if not files:
+        files = sorted(os.path.join(args.indir, f) for f in os.listdir(args.indir) if f.endswith("_ball_by_ball.csv"))
+    if not files:
+        raise SystemExit(f"[ERR] No feature or ball-by-ball CSVs in {args.indir}")
+    counts = fit_outcomes_files(files, args.chunksize)
+    save_outcomes(args.out, counts, files=[os.path.basename(f) for f in files], balls=int(counts.sum()))
+    print("[OK] Wrote:", args.out, "(balls:", int(counts.sum()), ")")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Synthetic Cricsheet corpus for benchmarks and local runs (`t20-synth`).
+
+Writes T20I match files in the v2 layout (`innings: [{team, overs: [{over, deliveries}]}]`)
+and the legacy layout (`innings: [{"1st innings": {team, deliveries: [{"0.1": {...}}]}}]`,
+read by `rows_from_legacy_innings`), with the info fields the extractor, index and
+dataset use (dates, teams, event, venue, city, season, toss, outcome, players).
+
+Deliveries follow per-phase outcome rates close to men's T20Is (wides, no-balls, byes,
+leg-byes, wickets by kind, 0-6 off the bat), with strike rotation, new batters after each
+wicket, five bowlers on four overs each, and the chase stopping once the target is
+reached. Each match is generated from its own seed, so a 100-match corpus is the first
+100 matches of a 100k one. The two target matches of t20.extract (IND-PAK 2022 T20WC,
+ENG-WI 2016 WT20 Final) are included unless --no-targets.
+
+Usage:
+  t20-synth --out data/raw/synth_1k.zip --matches 1000
+  t20-synth --out data/synth_json --matches 100 --legacy-share 0.5 --indent 2
+Only the standard library is used.
+"""
+import os, json, random, argparse
+
+TEAMS = {
+    "India": ("Wankhede Stadium", "Mumbai"),
+    "Pakistan": ("Gaddafi Stadium", "Lahore"),
+    "England": ("Edgbaston", "Birmingham"),
+    "West Indies": ("Kensington Oval", "Bridgetown"),
+    "Australia": ("Melbourne Cricket Ground", "Melbourne"),
+    "South Africa": ("Newlands", "Cape Town"),
+    "New Zealand": ("Eden Park", "Auckland"),
+    "Sri Lanka": ("R Premadasa Stadium", "Colombo"),
+    "Bangladesh": ("Shere Bangla National Stadium", "Mirpur"),
+    "Afghanistan": ("Sharjah Cricket Stadium", "Sharjah"),
+    "Ireland": ("Malahide", "Dublin"),
+    "Netherlands": ("VRA Ground", "Amstelveen"),
+}
+EVENTS = ["Bilateral T20I Series", "ICC Men's T20 World Cup", "Asia Cup", "Tri-Nation T20I Series"]
+
+# relative per-delivery outcome weights by phase: extras first, then wicket, then runs off the bat
+OUTCOMES = ("wides", "noballs", "legbyes", "byes", "wicket", 0, 1, 2, 3, 4, 6)
+RATES = {
+    "powerplay": (0.035, 0.006, 0.018, 0.004, 0.036, 0.430, 0.270, 0.060, 0.004, 0.135, 0.052),
+    "middle":    (0.030, 0.004, 0.015, 0.003, 0.040, 0.330, 0.430, 0.080, 0.005, 0.090, 0.040),
+    "death":     (0.040, 0.008, 0.015, 0.003, 0.070, 0.280, 0.330, 0.085, 0.004, 0.140, 0.100),
+}
+DISMISSALS = (("caught", 0.60), ("bowled", 0.17), ("lbw", 0.10), ("run out", 0.08),
+              ("stumped", 0.04), ("caught and bowled", 0.01))
+# five bowlers, four overs each, never two overs in a row
+BOWLING_ORDER = (0, 1, 0, 1, 2, 3, 2, 3, 4, 0, 4, 1, 2, 3, 4, 0, 1, 2, 3, 4)
+
+TARGET_MATCHES = (
+    # (file name, date, batting first, chasing, event, legacy layout)
+    ("1298150.json", "2022-10-23", "Pakistan", "India", "ICC Men's T20 World Cup", False),
+    ("951373.json", "2016-04-03", "England", "West Indies", "World T20", True),
+)
+
+def _cum(weights):
+    total, out, s = sum(weights), [], 0.0
+    for w in weights:
+        s += w / total; out.append(s)
+    out[-1] = 1.0
+    return out
+
+CUM_RATES = {phase: _cum(r) for phase, r in RATES.items()}
+CUM_OFF_BAT = _cum(RATES["middle"][5:])
+CUM_DISMISSALS = _cum([w for _, w in DISMISSALS])
+
+def phase_of(over):
+    """Phase of a 0-based over, as t20.features.phase_from_over on the 1-based one."""
+    return "powerplay" if over < 6 else ("middle" if over < 15 else "death")
+
+def squad(team):
+    return [f"{team[:3].upper()} Player {i + 1}" for i in range(11)]
+
+def _pick(rng, cum):
+    u = rng.random()
+    for i, c in enumerate(cum):
+        if u < c:
+            return i
+    return len(cum) - 1
+
+def simulate_innings(rng, batting, fielding, target=None):
+    """List of (over, deliveries) with v2-layout delivery dicts; stops at 10 wickets, 20 overs or the target."""
+    order, total, wkts = list(batting), 0, 0
+    striker, non_striker, next_in = 0, 1, 2
+    bowlers = fielding[6:] + fielding[5:6]
+    overs = []
+    for over in range(20):
+        bowler = bowlers[BOWLING_ORDER[over]]
+        cum = CUM_RATES[phase_of(over)]
+        deliveries, legal = [], 0
+        while legal < 6:
+            kind = OUTCOMES[_pick(rng, cum)]
+            d = {"batter": order[striker], "bowler": bowler, "non_striker": order[non_striker]}
+            bat, extras, ran = 0, 0, 0
+            if kind == "wides":
+                extras = 1 + (4 if rng.random() < 0.05 else 0)
+                d["extras"] = {"wides": extras}
+            elif kind == "noballs":
+                bat = OUTCOMES[5 + _pick(rng, CUM_OFF_BAT)] if rng.random() < 0.5 else 0
+                extras = 1
+                d["extras"] = {"noballs": 1}
+                ran = bat
+            elif kind in ("legbyes", "byes"):
+                extras = 4 if rng.random() < 0.15 else 1
+                d["extras"] = {kind: extras}
+                ran = extras
+            elif kind != "wicket":
+                bat = ran = kind
+            d["runs"] = {"batter": bat, "extras": extras, "total": bat + extras}
+            if kind not in ("wides", "noballs"):
+                legal += 1
+            if kind == "wicket":
+                how = DISMISSALS[_pick(rng, CUM_DISMISSALS)][0]
+                out_idx = non_striker if how == "run out" and rng.random() < 0.3 else striker
+                w = {"player_out": order[out_idx], "kind": how}
+                if how in ("caught", "run out", "stumped"):
+                    fielder = fielding[4] if how == "stumped" else fielding[rng.randrange(11)]
+                    w["fielders"] = [{"name": fielder}]
+                d["wickets"] = [w]
+                wkts += 1
+                if wkts < 10:
+                    if out_idx == striker:
+                        striker = next_in
+                    else:
+                        non_striker = next_in
+                    next_in += 1
+            total += bat + extras
+            deliveries.append(d)
+            if ran % 2 == 1:
+                striker, non_striker = non_striker, striker
+            if wkts >= 10 or (target is not None and total >= target):
+                break
+        overs.append((over, deliveries))
+        if wkts >= 10 or (target is not None and total >= target):
+            break
+        striker, non_striker = non_striker, striker
+    return overs, total, wkts
+
+def _v2_innings(team, overs):
+    return {"team": team, "overs": [{"over": o, "deliveries": ds} for o, ds in overs]}
+
+def _legacy_delivery(d):
+    out = {"batsman": d["batter"], "bowler": d["bowler"], "non_striker": d["non_striker"],
+           "runs": {"batsman": d["runs"]["batter"], "extras": d["runs"]["extras"], "total": d["runs"]["total"]}}
+    if "extras" in d:
+        out["extras"] = d["extras"]
+    if "wickets" in d:
+        w = d["wickets"][0]
+        out["wicket"] = {"kind": w["kind"], "player_out": w["player_out"]}
+        if "fielders" in w:
+            out["wicket"]["fielders"] = [f["name"] for f in w["fielders"]]
+    return out
+
+def _legacy_innings(name, team, overs):
+    deliveries = [{f"{o}.{i}": _legacy_delivery(d)} for o, ds in overs for i, d in enumerate(ds, start=1)]
+    return {name: {"team": team, "deliveries": deliveries}}
+
+def synth_match(seed, date, first, second, event, legacy=False, match_number=None):
+    """One Cricsheet match dict; `first` bats first."""
+    rng = random.Random(seed)
+    p1, p2 = squad(first), squad(second)
+    inn1, r1, _ = simulate_innings(rng, p1, p2)
+    inn2, r2, w2 = simulate_innings(rng, p2, p1, target=r1 + 1)
+    if r2 > r1:
+        outcome = {"winner": second, "by": {"wickets": 10 - w2}}
+    elif r1 > r2:
+        outcome = {"winner": first, "by": {"runs": r1 - r2}}
+    else:
+        outcome = {"result": "tie"}
+    toss_winner = first if rng.random() < 0.5 else second
+    venue, city = TEAMS.get(first, ("Neutral Ground", "Dubai"))
+    info = {
+        "city": city,
+        "dates": [date],
+        "event": {"name": event, "match_number": match_number or 1},
+        "gender": "male",
+        "match_type": "T20",
+        "outcome": outcome,
+        "teams": [first, second],
+        "toss": {"winner": toss_winner, "decision": "bat" if toss_winner == first else "field"},
+        "venue": venue,
+    }
+    if legacy:
+        return {"meta": {"data_version": 0.92, "created": date, "revision": 1}, "info": info,
+                "innings": [_legacy_innings("1st innings", first, inn1), _legacy_innings("2nd innings", second, inn2)]}
+    info.update({"balls_per_over": 6, "season": date[:4], "team_type": "international",
+                 "players": {first: p1, second: p2}})
+    return {"meta": {"data_version": "1.1.0", "created": date, "revision": 1}, "info": info,
+            "innings": [_v2_innings(first, inn1), _v2_innings(second, inn2)]}
+
+def iter_matches(n_matches, seed=0, legacy_share=0.2, targets=True):
+    """Yield (file name, match dict); match i depends only on (seed, i)."""
+    if targets:
+        for i, (name, date, first, second, event, legacy) in enumerate(TARGET_MATCHES):
+            yield name, synth_match(f"{seed}:target:{i}", date, first, second, event, legacy)
+    teams = sorted(TEAMS)
+    for i in range(n_matches):
+        rng = random.Random(f"{seed}:{i}")
+        first, second = rng.sample(teams, 2)
+        year = rng.randint(2006, 2024)
+        date = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        legacy = rng.random() < legacy_share
+        yield f"{1_000_000 + i}.json", synth_match(f"{seed}:{i}:m", date, first, second, rng.choice(EVENTS), legacy,
+                                                   match_number=rng.randint(1, 5))
+
+def write_corpus(out, n_matches, seed=0, legacy_share=0.2, targets=True, indent=None):
+    """Write the corpus to a zip (`out` ends in .zip) or a folder; returns counts and bytes written."""
+    dumps = (lambda m: json.dumps(m, indent=indent)) if indent else (lambda m: json.dumps(m, separators=(",", ":")))
+    stats = {"matches": 0, "legacy": 0, "deliveries": 0, "bytes": 0}
+    zf = None
+    if out.endswith(".zip"):
+        import zipfile
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        zf = zipfile.ZipFile(out + ".part", "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+    else:
+        os.makedirs(out, exist_ok=True)
+    try:
+        for name, match in iter_matches(n_matches, seed, legacy_share, targets):
+            raw = dumps(match).encode("utf-8")
+            if zf is not None:
+                zf.writestr(name, raw)
+            else:
+                with open(os.path.join(out, name), "wb") as f:
+                    f.write(raw)
+            legacy = "overs" not in match["innings"][0]
+            stats["matches"] += 1
+            stats["legacy"] += legacy
+            stats["deliveries"] += sum(len(next(iter(inn.values()))["deliveries"]) if legacy else
+                                       sum(len(o["deliveries"]) for o in inn["overs"]) for inn in match["innings"])
+            stats["bytes"] += len(raw)
+    finally:
+        if zf is not None:
+            zf.close()
+    if zf is not None:
+        os.replace(out + ".part", out)
+    return stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic Cricsheet T20I corpus (v2 and legacy layouts)")
+    ap.add_argument("--out", type=str, required=True, help="Zip file (*.zip) or folder to write")
+    ap.add_argument("--matches", type=int, default=1000, help="Matches to generate (besides the two targets)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--legacy-share", type=float, default=0.2, help="Fraction of matches in the legacy layout")
+    ap.add_argument("--indent", type=int, default=None, help="Pretty-print JSON like Cricsheet (default: compact)")
+    ap.add_argument("--no-targets", action="store_true", help="Leave out the two t20-extract target matches")
+    args = ap.parse_args(argv)
+    stats = write_corpus(args.out, args.matches, args.seed, args.legacy_share, not args.no_targets, args.indent)
+    print(f"[OK] Wrote {stats['matches']:,} matches ({stats['legacy']:,} legacy, {stats['deliveries']:,} deliveries, "
+          f"{stats['bytes'] / 1e6:.1f} MB of JSON) to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Many-match WP timelines (`t20-timelines`): every chase in a set of enriched CSVs drawn as one
+overlay, or as small multiples per team / event / season, with median and quantile bands by
+legal ball.
+
+Usage:
+  t20-timelines --indir outputs/tables --out outputs/figures/wp_timelines.png
+  t20-timelines --indir outputs/tables --by team --event "world cup" --season 2022 2024
+  t20-timelines --infile corpus_features_wp_enriched.csv --column wp_opt --max-lines 500
+CSVs are streamed --chunksize rows at a time (a match is held back until it is complete,
+as in the WP stage); a match whose rows are not contiguous is an error, not several chases.
+Each chase is reduced to its WP after every legal ball (0..120) and added to a (ball, WP bin)
+histogram, from which the bands are read; a seeded reservoir keeps --max-lines whole chases
+for the faint LineCollection. Memory and drawing time are fixed by --bins, --max-lines and
+the number of panels, not by the number of matches.
+Filters: --team matches the chasing or the defending side (the WP stage's defending_team,
+else the toss winner; substring, any case), --event a substring of the event name, --season
+the match year. Small multiples group chases by chasing team, event or season (largest
+--max-panels groups).
+Files without a match_id column are one match each.
+"""
+import os, random, argparse
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+MAX_BALLS = 120
+META_COLUMNS = ["match_id", "match_date", "event", "batting_team", "defending_team", "toss_winner", "season"]
+
+class TimelineAggregate:
+    """WP by legal ball over any number of chases, in fixed memory."""
+
+    def __init__(self, n_bins=200, max_lines=200, seed=0):
+        import numpy as np
+        self.n_bins, self.max_lines = n_bins, max_lines
+        self.hist = np.zeros((MAX_BALLS + 1, n_bins), dtype=np.int64)
+        self.lines, self.n = [], 0
+        self.rng = random.Random(seed)
+
+    def add(self, balls, wp):
+        """One chase: legal balls bowled and WP after each, one value per ball, in order."""
+        import numpy as np
+        bins = np.minimum((wp * self.n_bins).astype(np.int64), self.n_bins - 1)
+        np.add.at(self.hist, (balls, bins), 1)
+        # reservoir sampling: every chase seen so far is equally likely to be drawn
+        if len(self.lines) < self.max_lines:
+            self.lines.append(np.column_stack([balls, wp]).astype(np.float32))
+        else:
+            j = self.rng.randrange(self.n + 1)
+            if j < self.max_lines:
+                self.lines[j] = np.column_stack([balls, wp]).astype(np.float32)
+        self.n += 1
+
+    def bands(self, quantiles=QUANTILES):
+        """{q: WP per ball (NaN where no chase reached the ball)} from the histogram."""
+        import numpy as np
+        total = self.hist.sum(axis=1)
+        cdf = np.cumsum(self.hist, axis=1) / np.maximum(total, 1)[:, None]
+        mids = (np.arange(self.n_bins) + 0.5) / self.n_bins
+        out = {}
+        for q in quantiles:
+            idx = np.minimum((cdf < q).sum(axis=1), self.n_bins - 1)
+            out[q] = np.where(total > 0, mids[idx], np.nan)
+        return out
+
+    def figure_data(self, title=None):
+        import numpy as np
+        return {"title": title, "n": self.n, "balls": np.arange(MAX_BALLS + 1), "bands": self.bands(),
+                "lines": list(self.lines), "alpha": min(0.5, max(0.05, 10 / max(len(self.lines), 1)))}
+
+def _norm(s):
+    return "" if s is None or s != s else str(s).strip().lower()
+
+def match_meta(first):
+    """(chasing, defending, event, season) of a chase from its first row."""
+    chasing, defending = first.get("batting_team"), first.get("defending_team")
+    if _norm(defending) == "":
+        toss = first.get("toss_winner")
+        defending = toss if _norm(toss) and _norm(toss) != _norm(chasing) else None
+    season = first.get("season")
+    if _norm(season) == "":
+        date = first.get("match_date")
+        season = str(date)[:4] if _norm(date) else None
+    return chasing, defending, first.get("event"), None if season is None else str(season)
+
+def keep(meta, team=None, event=None, seasons=None):
+    chasing, defending, ev, season = meta
+    if team and not any(_norm(team) in _norm(t) for t in (chasing, defending) if t):
+        return False
+    if event and _norm(event) not in _norm(ev):
+        return False
+    if seasons and str(season) not in {str(s) for s in seasons}:
+        return False
+    return True
+
+def _reduce(part, column):
+    """(balls, wp) after each legal ball of one chase: the last delivery at every ball count."""
+    import numpy as np
+    if "balls_bowled_legal" in part.columns:
+        balls = part["balls_bowled_legal"].to_numpy(dtype=float)
+    else:
+        balls = MAX_BALLS - part["balls_remaining"].to_numpy(dtype=float)
+    wp = part[column].to_numpy(dtype=float)
+    ok = ~(np.isnan(balls) | np.isnan(wp))
+    balls, wp = np.clip(balls[ok], 0, MAX_BALLS).astype(np.int64), np.clip(wp[ok], 0.0, 1.0)
+    last = np.r_[balls[1:] != balls[:-1], True] if len(balls) else np.zeros(0, dtype=bool)
+    return balls[last], wp[last]
+
+def iter_chases(paths, column="wp_pred", chunksize=200_000):
+    """(meta, balls, wp) per chase, reading each CSV in chunks; matches are in file order."""
+    import pandas as pd
+    from t20.features import read_csv_chunks
+    for path in paths:
+        header = pd.read_csv(path, nrows=0).columns
+        if column not in header:
+            raise ValueError(f"{path} has no {column} column")
+        cols = set(META_COLUMNS + ["innings", "balls_bowled_legal", "balls_remaining", column])
+        has_id = "match_id" in header
+        pending, done = None, set()
+
+        def complete(part, key):
+            # a match seen again after it was emitted: rows are not grouped by match
+            if key in done:
+                raise ValueError(f"{path}: rows of match {key} are not contiguous; re-run t20-wp "
+                                 "(or sort by match_id) before streaming it")
+            done.add(key)
+            return (match_meta(part.iloc[0].to_dict()),) + _reduce(part, column)
+
+        for chunk in read_csv_chunks(path, chunksize, usecols=lambda c: c in cols):
+            chunk = chunk[chunk["innings"] == 2]
+            if pending is not None:
+                chunk = pd.concat([pending, chunk], ignore_index=True)
+            if chunk.empty or not has_id:
+                pending = chunk
+                continue
+            ids = chunk["match_id"].astype(str).to_numpy()
+            tail = ids == ids[-1]
+            pending = chunk[tail]
+            for key, part in chunk[~tail].groupby(ids[~tail], sort=False):
+                yield complete(part, key)
+        if pending is not None and not pending.empty:
+            yield complete(pending, str(pending["match_id"].iloc[0]) if has_id else None)
+
+GROUPS = {"team": 0, "event": 2, "season": 3}
+
+def collect(paths, column="wp_pred", by=None, team=None, event=None, seasons=None,
+            n_bins=200, max_lines=200, seed=0, chunksize=200_000):
+    """{group: TimelineAggregate} ({None: ...} without `by`) over the chases passing the filters."""
+    groups = {}
+    for meta, balls, wp in iter_chases(paths, column, chunksize):
+        if not len(balls) or not keep(meta, team, event, seasons):
+            continue
+        key = None if by is None else (meta[GROUPS[by]] or "unknown")
+        agg = groups.get(key)
+        if agg is None:
+            agg = groups[key] = TimelineAggregate(n_bins, max_lines, seed)
+        agg.add(balls, wp)
+    return groups
+
+def timeline_job(groups, out, by=None, max_panels=12, ncols=4, title=None):
+    """A t20.figures render job: one overlay, or small multiples of the largest groups."""
+    if by is None:
+        agg = groups.get(None)
+        data = agg.figure_data() if agg else None
+        return ("wp_overlay", out, title or f"WP timelines – {agg.n if agg else 0} chases", data)
+    top = sorted(groups.items(), key=lambda kv: (-kv[1].n, str(kv[0])))[:max_panels]
+    panels = [agg.figure_data(str(key)) for key, agg in top]
+    n = sum(agg.n for agg in groups.values())
+    return ("wp_multiples", out, title or f"WP timelines by {by} – {n} chases",
+            {"panels": panels, "ncols": min(ncols, max(len(panels), 1))})
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Overlay or small multiples of WP timelines for many matches")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--infile", type=str, nargs="+", help="Enriched CSV(s) from 03_wp_pipeline.py")
+    src.add_argument("--indir", type=str, help="Folder with *_wp_enriched.csv files")
+    ap.add_argument("--out", type=str, default="outputs/figures/wp_timelines.png")
+    ap.add_argument("--by", choices=sorted(GROUPS), default=None, help="Small multiples per group (default: one overlay)")
+    ap.add_argument("--team", type=str, default=None, help="Only chases involving this team")
+    ap.add_argument("--event", type=str, default=None, help="Only matches whose event contains this")
+    ap.add_argument("--season", nargs="+", default=None, help="Only these seasons (match year)")
+    ap.add_argument("--column", choices=("wp_pred", "wp_opt", "wp_sim"), default="wp_pred", help="WP series to draw")
+    ap.add_argument("--max-lines", type=int, default=200, help="Chases drawn as lines per panel (sampled)")
+    ap.add_argument("--max-panels", type=int, default=12, help="With --by: largest groups shown")
+    ap.add_argument("--bins", type=int, default=200, help="WP bins of the histogram behind the bands")
+    ap.add_argument("--chunksize", type=int, default=200_000, help="Rows read at a time")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    if args.indir:
+        paths = sorted(os.path.join(args.indir, f) for f in os.listdir(args.indir) if f.endswith("_wp_enriched.csv"))
+    else:
+        paths = args.infile
+    if not paths:
+        ap.error("no enriched CSVs to read")
+
+    try:
+        groups = collect(paths, args.column, args.by, args.team, args.event, args.season,
+                         args.bins, args.max_lines, args.seed, args.chunksize)
+    except ValueError as e:
+        ap.error(str(e))
+    n = sum(agg.n for agg in groups.values())
+    if not n:
+        raise SystemExit("[ERR] No chases match the filters")
+    from t20.figures import render
+    path = render(timeline_job(groups, args.out, args.by, args.max_panels))
+    print(f"[OK] Saved: {path} ({n} chases{f', {len(groups)} groups' if args.by else ''})")
+
+if __name__ == "__main__":
+    main()
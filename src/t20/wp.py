@@ -0,0 +1,106 @@
+"""
+Win-probability scoring.
+
+`predict_wp_placeholder` scores one delivery (a row); `PlaceholderWP.predict` computes
+the same heuristic over whole columns at once, including the runs_remaining == 0 /
+balls_remaining == 0 edge cases and the <=6 / <=3 runs bumps.
+
+Any object with `predict(frame) -> np.ndarray` can be passed wherever a model is
+accepted (`predict_wp_batch`, `compute_wp_series`). `frame` is a DataFrame or a
+mapping of column name -> array with the feature columns below; rows outside the
+chase (innings != 2) must come back as NaN. `SklearnWP` wraps a fitted classifier.
+"""
+import math
+import numpy as np, pandas as pd
+
+FEATURE_COLUMNS = ["innings", "over", "CRR", "RRR", "innings_wkts", "balls_remaining", "runs_remaining"]
+
+def predict_wp_placeholder(row: pd.Series) -> float:
+    if row["innings"] != 2:
+        return np.nan
+    crr = row.get("CRR", np.nan)
+    rrr = row.get("RRR", np.nan)
+    wkts = row.get("innings_wkts", np.nan)
+    balls_rem = row.get("balls_remaining", np.nan)
+    runs_rem = row.get("runs_remaining", np.nan)
+    if isinstance(runs_rem, (int, float)) and runs_rem == 0:
+        return 1.0
+    if isinstance(balls_rem, (int, float)) and balls_rem == 0 and runs_rem and runs_rem > 0:
+        return 0.0
+    crr = 0.0 if pd.isna(crr) else crr
+    rrr = 0.0 if pd.isna(rrr) else rrr
+    wkts = 0.0 if pd.isna(wkts) else wkts
+    margin = crr - rrr
+    wickets_term = max(0.0, 10.0 - wkts) / 10.0
+    if wkts >= 6: wickets_term *= 0.8
+    over = row.get("over", 1)
+    phase_bonus = 0.00 if over <= 6 else (0.05 if over <= 15 else -0.03)
+    z = 0.8 * margin + 0.6 * (wickets_term - 0.5) + phase_bonus
+    wp = 1 / (1 + math.exp(-z))
+    if runs_rem is not None and balls_rem is not None and balls_rem > 0:
+        if runs_rem <= 6: wp = min(1.0, wp + 0.06)
+        if runs_rem <= 3: wp = min(1.0, wp + 0.06)
+    return float(np.clip(wp, 0.0, 1.0))
+
+def get_column(frame, name, default=np.nan, n=None):
+    if name in frame:
+        return np.asarray(frame[name], dtype=float)
+    return np.full(n, default, dtype=float)
+
+def n_rows(frame):
+    if isinstance(frame, pd.DataFrame):
+        return len(frame)
+    return len(np.asarray(frame["innings"]))
+
+class PlaceholderWP:
+    """Column-wise version of predict_wp_placeholder."""
+    name = "placeholder"
+
+    def predict(self, frame):
+        n = n_rows(frame)
+        innings = get_column(frame, "innings", n=n)
+        crr = np.nan_to_num(get_column(frame, "CRR", n=n), nan=0.0)
+        rrr = np.nan_to_num(get_column(frame, "RRR", n=n), nan=0.0)
+        wkts = np.nan_to_num(get_column(frame, "innings_wkts", n=n), nan=0.0)
+        balls_rem = get_column(frame, "balls_remaining", n=n)
+        runs_rem = get_column(frame, "runs_remaining", n=n)
+        over = get_column(frame, "over", default=1.0, n=n)
+
+        wickets_term = np.maximum(0.0, 10.0 - wkts) / 10.0
+        wickets_term = np.where(wkts >= 6, wickets_term * 0.8, wickets_term)
+        phase_bonus = np.where(over <= 6, 0.00, np.where(over <= 15, 0.05, -0.03))
+        z = 0.8 * (crr - rrr) + 0.6 * (wickets_term - 0.5) + phase_bonus
+        with np.errstate(over="ignore"):
+            wp = 1 / (1 + np.exp(-z))
+        live = balls_rem > 0
+        wp = np.where(live & (runs_rem <= 6), np.minimum(1.0, wp + 0.06), wp)
+        wp = np.where(live & (runs_rem <= 3), np.minimum(1.0, wp + 0.06), wp)
+        wp = np.clip(wp, 0.0, 1.0)
+
+        wp = np.where((balls_rem == 0) & (runs_rem > 0), 0.0, wp)
+        wp = np.where(runs_rem == 0, 1.0, wp)
+        return np.where(innings == 2, wp, np.nan)
+
+class SklearnWP:
+    """Adapter for a fitted scikit-learn classifier trained on `features` (label 1 = chasing side won)."""
+
+    def __init__(self, estimator, features=("runs_remaining", "balls_remaining", "innings_wkts")):
+        self.estimator = estimator
+        self.features = list(features)
+        self.name = type(estimator).__name__
+
+    def predict(self, frame):
+        n = n_rows(frame)
+        innings = get_column(frame, "innings", n=n)
+        X = np.column_stack([np.nan_to_num(get_column(frame, f, n=n), nan=0.0) for f in self.features])
+        out = np.full(n, np.nan)
+        chase = innings == 2
+        if chase.any():
+            out[chase] = self.estimator.predict_proba(X[chase])[:, 1]
+        return out
+
+DEFAULT_MODEL = PlaceholderWP()
+
+def predict_wp_batch(frame, model=None):
+    """Score every row of `frame` (any number of deliveries/matches) in one call."""
+    return (model or DEFAULT_MODEL).predict(frame)
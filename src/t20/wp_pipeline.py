@@ -0,0 +1,282 @@
+"""
+WP stage (`t20-wp`, scripts/03_wp_pipeline.py): WP series and eventual outcome per
+chase, calibration curves, simulated counterfactual WP (t20.simulate: wp_opt/wp_delta),
+enriched CSVs and plots. The frame-level functions are shared with `t20-run`.
+Usage:
+  t20-wp --indir outputs --outdir outputs/wp_outputs
+With --chunksize N, feature CSVs are streamed N rows at a time with compact dtypes;
+rows are held back only until their match is complete (won_eventual needs the whole
+chase), and the metrics are accumulated chunk by chunk. Timeline and ΔWP histogram
+plots are per-match figures and are only drawn in the default (whole-file) mode.
+With --model models/wp_table.npy, WP comes from the trained state table (t20-train-wp)
+instead of the placeholder heuristic.
+The chase simulator's ball-outcome distributions are counted from all input files, or read
+from --sim (t20-fit-sim); --sim-paths sets the paths simulated per chase state.
+Each file's WP metrics (t20.metrics: reliability bins, Brier, log loss, AUC) are saved
+as `<base>_wp_metrics.json` and merged into a corpus-level `wp_metrics.json` plus
+`wp_calibration_all.png`; calibration within one match means little, since the outcome
+is the same for every ball of a chase.
+Plots are drawn after all CSVs are written, on --workers processes (t20.figures), and each
+PNG is skipped while the enriched CSV it was drawn from is unchanged. --no-plots leaves
+them out entirely.
+Timings, rows and bytes per sub-step go to the run report (t20.instrument).
+numpy/pandas are imported inside the functions that use them.
+"""
+import os, argparse
+
+from t20.instrument import step, file_size, add_arguments, stage_run
+
+def defending_teams(df):
+    """{match_id (None for a one-match frame): first-innings batting team} from innings-1 rows."""
+    if "batting_team" not in df.columns:
+        return {}
+    first = df[df["innings"] == 1]
+    if "match_id" not in first.columns:
+        return {None: str(first["batting_team"].iloc[0])} if len(first) else {}
+    teams = first.drop_duplicates("match_id")
+    return dict(zip(teams["match_id"].tolist(), teams["batting_team"].astype(str).tolist()))
+
+def compute_wp_series(df, model=None, defending=None):
+    """Innings-2 rows with wp_pred, won_eventual and defending_team (the side that batted first)."""
+    from t20.wp import predict_wp_batch
+    defending = defending_teams(df) if defending is None else defending
+    ch = df[df["innings"] == 2].copy()
+    if "match_id" in ch.columns:
+        ch["defending_team"] = [defending.get(m) for m in ch["match_id"].tolist()]
+    else:
+        ch["defending_team"] = defending.get(None)
+    ch["wp_pred"] = predict_wp_batch(ch, model)
+    chased = ch["runs_remaining"] == 0
+    if "match_id" in ch.columns:
+        # several matches at once: the outcome is per match
+        ch["won_eventual"] = chased.groupby(ch["match_id"], observed=True).transform("any").astype(int)
+    else:
+        ch["won_eventual"] = 1 if chased.any() else 0
+    return ch
+
+def wp_metrics(df_wp, n_bins=10):
+    """WPMetrics (reliability bins, Brier, log loss, AUC) over scored chase rows; merge across files/workers."""
+    from t20.metrics import WPMetrics
+    return WPMetrics(n_bins).update(df_wp["wp_pred"], df_wp["won_eventual"])
+
+def calibration_curve_df(df_wp, n_bins=10):
+    return wp_metrics(df_wp, n_bins).reliability()
+
+def enrich(df, model=None, n_bins=10, sim=None):
+    """(enriched chase rows, WPMetrics) for a features frame; without `sim`, outcomes are fitted on `df`."""
+    from t20.simulate import ChaseSimulator, fit_outcomes, optimized_wp
+    keys = ["innings","over","ball_in_over"]
+    if "match_id" in df.columns:
+        # whole matches in file order (as the streaming path emits them), each in delivery order
+        import pandas as pd
+        df = df.assign(_match=pd.factorize(df["match_id"])[0])
+        df = df.sort_values(["_match"] + keys, kind="stable").drop(columns="_match").reset_index(drop=True)
+    else:
+        df = df.sort_values(keys).reset_index(drop=True)
+    with step("wp_scoring") as s:
+        df_wp = compute_wp_series(df, model)
+        s.rows += len(df_wp)
+    with step("metrics") as s:
+        metrics = wp_metrics(df_wp, n_bins)
+        s.rows += len(df_wp)
+    with step("simulate") as s:
+        df_opt = optimized_wp(df_wp, sim or ChaseSimulator(fit_outcomes(df)))
+        s.rows += len(df_opt)
+    return df_opt, metrics
+
+def process_file(infile, outdir, model=None, n_bins=10, sim=None):
+    import pandas as pd
+    from t20.figures import wp_figure_data
+    with step("csv_read") as s:
+        df = pd.read_csv(infile)
+        s.rows += len(df); s.bytes_read += file_size(infile)
+    df_opt, metrics = enrich(df, model, n_bins, sim)
+
+    out_csv = enriched_path(infile, outdir)
+    os.makedirs(outdir, exist_ok=True)
+    with step("csv_write") as s:
+        df_opt.to_csv(out_csv, index=False)
+        s.rows += len(df_opt); s.bytes_written += file_size(out_csv)
+    return wp_figure_data(df_opt, metrics.reliability()), metrics
+
+def process_file_streaming(infile, outdir, chunksize, n_bins=10, model=None, sim=None):
+    import pandas as pd
+    from t20.features import read_csv_chunks
+    from t20.figures import wp_figure_data
+    from t20.metrics import WPMetrics
+    from t20.simulate import load_simulator, optimized_wp
+    sim = sim or load_simulator(inputs=[infile], chunksize=chunksize)
+    base = os.path.splitext(os.path.basename(infile))[0]
+    os.makedirs(outdir, exist_ok=True)
+    out_csv = os.path.join(outdir, f"{base}_wp_enriched.csv")
+    metrics = WPMetrics(n_bins)
+    pending, n_rows = None, 0
+    defending = {}  # first-innings batting team of matches not yet emitted
+
+    write = None
+
+    def emit(part, f):
+        nonlocal n_rows, write
+        with step("wp_scoring") as s:
+            df_wp = compute_wp_series(part, model, defending)
+            s.rows += len(df_wp)
+        if "match_id" in part.columns:
+            for m in part["match_id"].unique().tolist():
+                defending.pop(m, None)
+        with step("metrics") as s:
+            metrics.update(df_wp["wp_pred"], df_wp["won_eventual"])
+            s.rows += len(df_wp)
+        with step("simulate") as s:
+            df_opt = optimized_wp(df_wp, sim)
+            s.rows += len(df_opt)
+        with step("csv_write") as write:
+            df_opt.to_csv(f, index=False, header=n_rows == 0)
+            write.rows += len(df_opt)
+        n_rows += len(df_wp)
+
+    with open(out_csv + ".part", "w", newline="", encoding="utf-8") as f:
+        chunks = read_csv_chunks(infile, chunksize)
+        while True:
+            with step("csv_read") as read:
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            read.rows += len(chunk)
+            defending.update(defending_teams(chunk))
+            chunk = chunk[chunk["innings"] == 2]
+            if pending is not None:
+                chunk = pd.concat([pending, chunk], ignore_index=True)
+            if chunk.empty:
+                continue
+            if "match_id" not in chunk.columns:
+                pending = chunk; continue
+            # hold back the last (possibly unfinished) match
+            last = chunk["match_id"].astype(str).to_numpy()
+            tail = last == last[-1]
+            pending = chunk[tail]
+            if (~tail).any():
+                emit(chunk[~tail], f)
+        if pending is not None and not pending.empty:
+            emit(pending, f)
+    os.replace(out_csv + ".part", out_csv)
+    read.bytes_read += file_size(infile)
+    if write is not None:
+        write.bytes_written += file_size(out_csv)
+    return wp_figure_data(None, metrics.reliability()), metrics
+
+def enriched_path(infile, outdir):
+    base = os.path.splitext(os.path.basename(infile))[0]
+    return os.path.join(outdir, f"{base}_wp_enriched.csv")
+
+def metrics_path(infile, outdir):
+    base = os.path.splitext(os.path.basename(infile))[0]
+    return os.path.join(outdir, f"{base}_wp_metrics.json")
+
+def figure_paths(infile, outdir, streaming=False):
+    """{kind: png path}; streaming runs only draw the calibration curve."""
+    from t20.figures import WP_FIGURES
+    base = os.path.splitext(os.path.basename(infile))[0]
+    kinds = ["calibration"] if streaming else list(WP_FIGURES)
+    return {k: os.path.join(outdir, f"{base}_{k}.png") for k in kinds}
+
+def figure_data_from_csv(enriched, n_bins=10):
+    import pandas as pd
+    from t20.figures import wp_figure_data
+    df_opt = pd.read_csv(enriched, usecols=lambda c: c in ("wp_pred", "won_eventual", "wp_opt", "wp_delta"))
+    return wp_figure_data(df_opt, calibration_curve_df(df_opt, n_bins))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Score WP, write enriched CSVs and draw the per-file plots")
+    ap.add_argument("--indir", type=str, default="outputs", help="Folder with *_features.csv files")
+    ap.add_argument("--outdir", type=str, default="outputs/wp_outputs", help="Where to write enriched files & plots")
+    ap.add_argument("--manifest", type=str, default="manifest.json", help="Manifest holding the stage cache")
+    ap.add_argument("--force", action="store_true", help="Ignore the cache and recompute everything")
+    ap.add_argument("--chunksize", type=int, default=None, help="Stream feature CSVs this many rows at a time")
+    ap.add_argument("--model", type=str, default=None, help="WP state table from t20-train-wp (default: placeholder)")
+    ap.add_argument("--no-plots", action="store_true", help="Only write the enriched CSVs")
+    ap.add_argument("--workers", type=int, default=None, help="Processes for drawing plots (default: all cores)")
+    ap.add_argument("--n-bins", type=int, default=10, help="Reliability bins for calibration curves and metrics")
+    ap.add_argument("--sim", type=str, default=None, help="Outcome counts from t20-fit-sim (default: fitted on --indir)")
+    ap.add_argument("--sim-paths", type=int, default=1000, help="Simulated paths per chase state for wp_opt/wp_delta")
+    add_arguments(ap)
+    args = ap.parse_args(argv)
+    with stage_run("wp", args, argv):
+        _run(args)
+
+def _run(args):
+    model = None
+    if args.model:
+        from t20.wp_table import TableWP
+        model = TableWP(args.model)
+    from t20.cache import StageCache, module_files
+    cache = StageCache("wp", module_files("wp", "wp_pipeline", "wp_table", "features", "metrics", "simulate"),
+                       params={"n_bins": args.n_bins, "streaming": bool(args.chunksize), "model": args.model,
+                               "sim": args.sim, "sim_paths": args.sim_paths},
+                       manifest=args.manifest, force=args.force)
+    from t20.metrics import WPMetrics, save_metrics, load_metrics
+    files = sorted(os.path.join(args.indir, f) for f in os.listdir(args.indir) if f.endswith("_features.csv"))
+    # the simulator's outcome distributions come from --sim or from every input file
+    sim_inputs = [args.sim] if args.sim else files
+    sim = None
+    computed, parts = {}, []
+    for f in files:
+        out_csv, out_metrics = enriched_path(f, args.outdir), metrics_path(f, args.outdir)
+        unit = cache.rel(out_csv)
+        inputs = [f] + ([args.model] if args.model else []) + sim_inputs
+        if cache.fresh(unit, inputs, [out_csv, out_metrics]):
+            print("[SKIP] Up to date:", out_csv)
+            parts.append(load_metrics(out_metrics))
+            continue
+        if sim is None:
+            from t20.simulate import load_simulator
+            with step("fit_simulator"):
+                sim = load_simulator(args.sim, files, args.sim_paths, chunksize=args.chunksize)
+        if args.chunksize:
+            computed[f], metrics = process_file_streaming(f, args.outdir, args.chunksize, args.n_bins, model, sim)
+        else:
+            computed[f], metrics = process_file(f, args.outdir, model, args.n_bins, sim)
+        save_metrics(out_metrics, metrics)
+        parts.append(metrics)
+        cache.record(unit, inputs, [out_csv, out_metrics])
+    cache.save()
+    print("[OK] Wrote enriched CSVs to", args.outdir)
+
+    # per-match calibration says little (won_eventual is constant within a chase): pool every file
+    corpus = WPMetrics.combine(parts, n_bins=args.n_bins)
+    report = os.path.join(args.outdir, "wp_metrics.json")
+    save_metrics(report, corpus, files=len(parts))
+    print("[OK] Corpus metrics:", ", ".join(f"{k}={v:.4g}" for k, v in corpus.summary().items()))
+    if args.no_plots:
+        return
+
+    from t20.figures import render_jobs, wp_figure_data, wp_figure_jobs
+    figs = StageCache("wp_figures", module_files("wp_pipeline", "figures"), params={"dpi": 200, "n_bins": args.n_bins},
+                      manifest=args.manifest, force=args.force)
+    jobs, sources = [], []
+    for f in files:
+        out_csv = enriched_path(f, args.outdir)
+        stale = {k: p for k, p in figure_paths(f, args.outdir, bool(args.chunksize)).items()
+                 if not figs.fresh(figs.rel(p), [out_csv], [p])}
+        if not stale:
+            continue
+        data = computed.get(f)
+        if data is None:
+            with step("csv_read") as s:
+                data = figure_data_from_csv(out_csv, args.n_bins)
+                s.bytes_read += file_size(out_csv)
+        base = os.path.splitext(os.path.basename(f))[0]
+        new = wp_figure_jobs(base, args.outdir, data, kinds=list(stale))
+        jobs += new; sources += [out_csv] * len(new)
+    corpus_png = os.path.join(args.outdir, "wp_calibration_all.png")
+    if parts and not figs.fresh(figs.rel(corpus_png), [report], [corpus_png]):
+        jobs.append(("calibration", corpus_png, f"Calibration – all files ({len(parts)})",
+                     wp_figure_data(None, corpus.reliability())["calibration"]))
+        sources.append(report)
+    render_jobs(jobs, args.workers)
+    for (_, path, _, _), out_csv in zip(jobs, sources):
+        figs.record(figs.rel(path), [out_csv], [path])
+    figs.save()
+    print("[OK] Drew", len(jobs), "plots in", args.outdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Trained win-probability model served as a dense state table.
+
+The chase state space is small and discrete: runs_remaining (0..MAX_RUNS) x
+balls_remaining (0..120) x innings_wkts (0..10). `t20-train-wp` fits a classifier
+on the extracted corpus, evaluates it on every state once and saves the result as
+a float32 .npy (with a .json sidecar). `TableWP` memory-maps the table and scores
+deliveries with a single array index; states outside the table go to a fallback
+model (the placeholder heuristic by default).
+
+Usage:
+  t20-train-wp --indir data/processed --out models/wp_table.npy
+  t20-train-wp --dataset data/processed/t20i --out models/wp_table.npy
+  python scripts/03_wp_pipeline.py --indir data/processed --outdir outputs/tables --model models/wp_table.npy
+numpy/pandas/scikit-learn are imported inside the functions that use them.
+"""
+import os, json, argparse
+
+MAX_RUNS = 400
+MAX_BALLS = 120
+MAX_WKTS = 10
+STATE_COLUMNS = ["runs_remaining", "balls_remaining", "innings_wkts"]
+
+def load_training_frame(indir=None, dataset=None, seasons=None):
+    """Chase deliveries with the state columns and `won` (1 if the chasing side got home)."""
+    import pandas as pd
+    cols = ["match_id", "innings"] + STATE_COLUMNS
+    if dataset:
+        from t20.dataset import read_table
+        df = read_table(os.path.join(dataset, "features"), columns=cols, seasons=seasons)
+    else:
+        parts = []
+        for f in sorted(os.listdir(indir)):
+            if f.endswith("_features.csv"):
+                part = pd.read_csv(os.path.join(indir, f), usecols=lambda c: c in cols)
+                if "match_id" not in part.columns:
+                    part["match_id"] = f
+                parts.append(part)
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=cols)
+    df = df[df["innings"] == 2].dropna(subset=STATE_COLUMNS)
+    df["match_id"] = df["match_id"].astype(str)
+    df["won"] = (df["runs_remaining"] == 0).groupby(df["match_id"]).transform("any").astype(int)
+    return df.reset_index(drop=True)
+
+def fit_model(df):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    # more runs needed -> lower WP; more balls left -> higher; more wickets down -> lower
+    model = HistGradientBoostingClassifier(monotonic_cst=[-1, 1, -1], max_iter=200, learning_rate=0.1)
+    model.fit(df[STATE_COLUMNS].to_numpy(dtype=float), df["won"].to_numpy())
+    return model
+
+def build_table(model, max_runs=MAX_RUNS):
+    import numpy as np
+    runs, balls, wkts = np.meshgrid(
+        np.arange(max_runs + 1), np.arange(MAX_BALLS + 1), np.arange(MAX_WKTS + 1), indexing="ij")
+    X = np.column_stack([runs.ravel(), balls.ravel(), wkts.ravel()]).astype(float)
+    table = model.predict_proba(X)[:, 1].reshape(runs.shape).astype(np.float32)
+    # terminal states are known exactly
+    table[:, 0, :] = 0.0
+    table[:, :, MAX_WKTS] = 0.0
+    table[0, :, :] = 1.0
+    return table
+
+def save_table(path, table, meta):
+    import numpy as np
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.save(path, table)
+    with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(dict(meta, shape=list(table.shape), axes=STATE_COLUMNS), f, indent=2)
+
+class TableWP:
+    """O(1) WP lookup in a precomputed state table, with a fallback for other states."""
+
+    def __init__(self, path, fallback=None):
+        import numpy as np
+        from t20.wp import PlaceholderWP
+        self.path = path
+        self.table = np.load(path, mmap_mode="r")
+        self.fallback = fallback or PlaceholderWP()
+        self.name = f"table:{os.path.basename(path)}"
+
+    def lookup(self, runs_remaining, balls_remaining, innings_wkts):
+        """Scalar lookup for live use; None when the state is outside the table."""
+        r, b, w = int(runs_remaining), int(balls_remaining), int(innings_wkts)
+        R, B, W = self.table.shape
+        if 0 <= r < R and 0 <= b < B and 0 <= w < W:
+            return float(self.table[r, b, w])
+        return None
+
+    def predict(self, frame):
+        import numpy as np
+        from t20.wp import get_column, n_rows
+        n = n_rows(frame)
+        innings = get_column(frame, "innings", n=n)
+        state = [get_column(frame, c, n=n) for c in STATE_COLUMNS]
+        inside = innings == 2
+        for values, size in zip(state, self.table.shape):
+            inside &= ~np.isnan(values) & (values >= 0) & (values < size)
+        out = np.full(n, np.nan)
+        if inside.any():
+            r, b, w = (v[inside].astype(np.intp) for v in state)
+            out[inside] = self.table[r, b, w]
+        outside = (innings == 2) & ~inside
+        if outside.any():
+            out[outside] = self.fallback.predict(frame)[outside]
+        return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Train a WP model and write it as a state lookup table")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--indir", type=str, help="Folder with *_features.csv files")
+    src.add_argument("--dataset", type=str, help="Columnar dataset root (uses <dataset>/features)")
+    ap.add_argument("--seasons", nargs="*", default=None, help="With --dataset: seasons to train on")
+    ap.add_argument("--out", type=str, default="models/wp_table.npy", help="Where to write the table")
+    ap.add_argument("--max-runs", type=int, default=MAX_RUNS, help="Largest runs_remaining kept in the table")
+    args = ap.parse_args(argv)
+
+    df = load_training_frame(args.indir, args.dataset, args.seasons)
+    if df.empty or df["won"].nunique() < 2:
+        raise SystemExit("[ERR] Need chases with both outcomes to train a WP model")
+    model = fit_model(df)
+    table = build_table(model, args.max_runs)
+    import sklearn
+    save_table(args.out, table, {
+        "model": type(model).__name__,
+        "sklearn": sklearn.__version__,
+        "train_rows": int(len(df)),
+        "train_matches": int(df["match_id"].nunique()),
+    })
+    print("[OK] Wrote:", args.out, "(states:", table.size, "rows:", len(df), ")")
+
+if __name__ == "__main__":
+    main()
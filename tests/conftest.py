@@ -0,0 +1,15 @@
+import pandas as pd
+import pytest
+
+from t20.cricsheet import flatten_match_to_rows
+from t20.synth import iter_matches
+
+@pytest.fixture(scope="session")
+def ball_by_ball():
+    """Ball-by-ball rows of six synthetic matches keyed by match_id, in delivery order."""
+    frames = []
+    for name, match in iter_matches(6, seed=7, legacy_share=0.3, targets=False):
+        df = pd.DataFrame(flatten_match_to_rows(match)[1])
+        df.insert(0, "match_id", name.split(".")[0])
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
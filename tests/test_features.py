@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from t20.features import phase_codes, phase_from_over, phase_labels
+from t20.simulate import PHASES, fit_outcomes, phase_index
+
+def test_phase_labels_match_phase_from_over():
+    overs = np.arange(0, 21)
+    assert phase_labels(overs).tolist() == [phase_from_over(int(o)) for o in overs]
+    # the baseline buckets: over 1-6 powerplay, 7-15 middle, anything else death
+    assert phase_labels([0, 1, 6, 7, 15, 16]).tolist() == ["death", "powerplay", "powerplay", "middle", "middle", "death"]
+
+def test_simulator_buckets_follow_the_feature_phase(ball_by_ball):
+    over = ball_by_ball["over"].astype(int).to_numpy()
+    counts = fit_outcomes(ball_by_ball)
+    assert counts.sum(axis=1).tolist() == np.bincount(phase_codes(over), minlength=3).tolist()
+    # the ball bowled with b balls left is in over (120 - b) // 6 of the data
+    balls = np.arange(1, 121)
+    assert np.asarray(PHASES)[phase_index(balls)].tolist() == phase_labels((120 - balls) // 6).tolist()
+
+def rowwise_state(df):
+    """Running innings totals, target and phase of one match, delivery by delivery."""
+    rows, totals, target = [], {}, 1
+    for r in df.itertuples(index=False):
+        runs, wkts, legal = totals.get(r.innings, (0, 0, 0))
+        runs += int(r.runs_total)
+        wkts += bool(r.wicket_event)
+        legal += str(r.extras_type).lower() != "wides"
+        totals[r.innings] = (runs, wkts, legal)
+        if r.innings == 1:
+            target = runs + 1
+        rows.append((phase_from_over(int(r.over)), runs, wkts, legal, 120 - legal))
+    return rows, target
+
+def test_grouped_features_match_per_match(ball_by_ball):
+    from t20.features import add_match_state_features
+    matches = [part for _, part in ball_by_ball.groupby("match_id", sort=False)]
+    # hand the grouped path the matches out of order; it sorts them by match_id
+    grouped = add_match_state_features(pd.concat(matches[::-1], ignore_index=True))
+    per_match = pd.concat([add_match_state_features(m.drop(columns="match_id")) for m in
+                           sorted(matches, key=lambda m: m["match_id"].iloc[0])], ignore_index=True)
+    pd.testing.assert_frame_equal(grouped.drop(columns="match_id"), per_match, check_dtype=False)
+
+    columns = ["phase", "innings_runs", "innings_wkts", "balls_bowled_legal", "balls_remaining"]
+    for key, part in grouped.groupby("match_id", sort=False):
+        rows, target = rowwise_state(ball_by_ball[ball_by_ball["match_id"] == key].fillna({"extras_type": ""}))
+        assert list(part[columns].itertuples(index=False, name=None)) == rows
+        chase = part[part["innings"] == 2]
+        assert (chase["target_runs"] == target).all()
+        assert (chase["runs_remaining"] == np.maximum(target - chase["innings_runs"], 0)).all()
@@ -0,0 +1,24 @@
+import pytest
+
+from t20.serve import WPScorer, discretize
+
+def test_discretize_clips_and_defaults():
+    assert discretize({"runs_remaining": 37.4, "balls_remaining": 130, "wickets": 12}) == (None, 37, 120, 10)
+    assert discretize({"target_runs": 160, "runs_remaining": -3, "balls_remaining": 0, "innings_wkts": 4}) == (160, 0, 0, 4)
+
+@pytest.mark.parametrize("value", [float("inf"), float("-inf"), float("nan"), "1e400", "Infinity"])
+def test_discretize_rejects_non_finite(value):
+    # OverflowError here used to drop the connection instead of answering 400
+    with pytest.raises(ValueError):
+        discretize({"runs_remaining": value, "balls_remaining": 30, "wickets": 4})
+
+def test_discretize_rejects_missing():
+    with pytest.raises(ValueError):
+        discretize({"balls_remaining": 30, "wickets": 4})
+
+def test_scorer_caches_by_state():
+    scorer = WPScorer()
+    first = scorer.score([(160, 37, 30, 4), (160, 37, 30, 4)])
+    again = scorer.score([(160, 37, 30, 4)])
+    assert [r["cached"] for r in first + again] == [False, False, True]
+    assert first[0]["wp"] == again[0]["wp"]
@@ -0,0 +1,36 @@
+import numpy as np
+
+from t20.simulate import MAX_RUNS, ChaseSimulator, clip_states, fit_outcomes
+
+def test_clip_states_bounds_runs_balls_wickets():
+    state = clip_states([40000, -5, 50], [60, 130, -2], [0, 3, 12])
+    assert state.tolist() == [[MAX_RUNS, 60, 0], [0, 120, 3], [50, 0, 10]]
+
+def test_unreachable_target_is_lost(ball_by_ball):
+    # 40000 used to wrap around in the int16 path arrays and came back as a certain win
+    sim = ChaseSimulator(fit_outcomes(ball_by_ball), n_paths=200)
+    wp = sim.win_probs([40000, MAX_RUNS, 200], [60, 120, 60], [0, 0, 0])
+    assert (wp[:2] == 0.0).all()
+    assert (wp[2] == 0.0).all()
+    dense = ChaseSimulator(fit_outcomes(ball_by_ball), n_paths=200)
+    dense.sweep(20, 10)
+    assert (dense.win_probs([40000], [10], [0]) == 0.0).all()
+
+def test_forward_and_sweep_engines_agree(ball_by_ball):
+    counts = fit_outcomes(ball_by_ball)
+    rng = np.random.default_rng(0)
+    runs, balls, wkts = rng.integers(0, 60, 40), rng.integers(0, 40, 40), rng.integers(0, 10, 40)
+    forward = ChaseSimulator(counts, n_paths=200).simulate(runs, balls, wkts)
+    swept = ChaseSimulator(counts, n_paths=200)
+    swept.sweep(int(runs.max()), int(balls.max()))
+    np.testing.assert_allclose(swept.win_probs(runs, balls, wkts), forward)
+
+def test_optimized_wp_deltas(ball_by_ball):
+    from t20.features import add_match_state_features
+    from t20.simulate import optimized_wp
+    from t20.wp_pipeline import compute_wp_series
+    feat = add_match_state_features(ball_by_ball)
+    out = optimized_wp(compute_wp_series(feat), ChaseSimulator(fit_outcomes(feat), n_paths=100))
+    np.testing.assert_allclose(out["wp_delta"], out["wp_opt"] - out["wp_pred"])
+    np.testing.assert_allclose(out["wp_delta_sim"], out["wp_opt"] - out["wp_sim"])
+    assert (out["wp_delta_sim"].dropna() >= 0).all()
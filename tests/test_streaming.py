@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from t20.build_features import build_csv_features, build_csv_features_streaming
+
+@pytest.fixture
+def features_csv(ball_by_ball, tmp_path):
+    bbb = tmp_path / "synth_ball_by_ball.csv"
+    ball_by_ball.to_csv(bbb, index=False)
+    out = tmp_path / "synth_features.csv"
+    build_csv_features(str(bbb), str(out))
+    return str(bbb), str(out)
+
+@pytest.mark.parametrize("chunksize", [50, 137, 10_000])
+def test_streamed_features_match_whole_file(features_csv, tmp_path, chunksize):
+    bbb, whole = features_csv
+    streamed = str(tmp_path / "streamed_features.csv")
+    n = build_csv_features_streaming(bbb, streamed, chunksize)
+    expected = pd.read_csv(whole)
+    assert n == len(expected)
+    pd.testing.assert_frame_equal(pd.read_csv(streamed), expected)
+
+@pytest.mark.parametrize("chunksize", [60, 1_000])
+def test_streamed_wp_matches_whole_file(features_csv, tmp_path, chunksize):
+    from t20.simulate import ChaseSimulator, fit_outcomes
+    from t20.wp_pipeline import enriched_path, process_file, process_file_streaming
+    _, feat = features_csv
+    counts = fit_outcomes(pd.read_csv(feat))
+    _, whole = process_file(feat, str(tmp_path / "whole"), sim=ChaseSimulator(counts, n_paths=200))
+    _, streamed = process_file_streaming(feat, str(tmp_path / "streamed"), chunksize,
+                                         sim=ChaseSimulator(counts, n_paths=200))
+    expected = pd.read_csv(enriched_path(feat, str(tmp_path / "whole")))
+    got = pd.read_csv(enriched_path(feat, str(tmp_path / "streamed")))
+    pd.testing.assert_frame_equal(got, expected, rtol=1e-12)
+    assert streamed.n == whole.n == len(expected)
+    np.testing.assert_allclose(streamed.brier(), whole.brier(), rtol=1e-12)
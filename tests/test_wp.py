@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from t20.features import add_match_state_features
+from t20.wp import PlaceholderWP, predict_wp_batch, predict_wp_placeholder
+from t20.wp_pipeline import compute_wp_series
+
+def rowwise_wp_series(df):
+    """The baseline one-match compute_wp_series: df.apply over rows."""
+    ch = df[df["innings"] == 2].copy()
+    ch["wp_pred"] = ch.apply(predict_wp_placeholder, axis=1)
+    ch["won_eventual"] = 1 if (ch["runs_remaining"] == 0).any() else 0
+    return ch
+
+def test_batch_matches_rowwise_placeholder(ball_by_ball):
+    feat = add_match_state_features(ball_by_ball)
+    expected = feat.apply(predict_wp_placeholder, axis=1).to_numpy(dtype=float)
+    np.testing.assert_allclose(predict_wp_batch(feat), expected, rtol=0, atol=1e-12)
+
+def test_batch_matches_rowwise_on_edge_cases():
+    # chased, all balls gone short, last-over bumps, no legal ball yet, wickets >= 6, first innings
+    frame = pd.DataFrame({
+        "innings":         [2, 2, 2, 2, 2, 2, 1],
+        "over":            [20, 20, 20, 19, 1, 17, 3],
+        "CRR":             [8.0, 7.5, 7.9, 8.1, np.nan, 6.0, 9.0],
+        "RRR":             [0.0, np.nan, 36.0, 12.0, 9.0, 14.0, np.nan],
+        "innings_wkts":    [4, 9, 7, 6, 0, 8, 1],
+        "balls_remaining": [0, 0, 1, 6, 120, 9, 100],
+        "runs_remaining":  [0, 5, 3, 6, 150, 21, np.nan],
+    })
+    expected = frame.apply(predict_wp_placeholder, axis=1).to_numpy(dtype=float)
+    np.testing.assert_allclose(PlaceholderWP().predict(frame), expected, rtol=0, atol=1e-12)
+    columns = {c: frame[c].to_numpy() for c in frame.columns}
+    np.testing.assert_allclose(PlaceholderWP().predict(columns), expected, rtol=0, atol=1e-12)
+
+def test_multi_match_series_matches_per_match(ball_by_ball):
+    feat = add_match_state_features(ball_by_ball)
+    got = compute_wp_series(feat)
+    expected = pd.concat([rowwise_wp_series(part) for _, part in feat.groupby("match_id", sort=False)])
+    assert got.index.tolist() == expected.index.tolist()
+    np.testing.assert_allclose(got["wp_pred"], expected["wp_pred"], rtol=0, atol=1e-12)
+    assert got["won_eventual"].tolist() == expected["won_eventual"].tolist()
+    assert 0 < expected["won_eventual"].mean() < 1